@@ -1,63 +1,292 @@
 """
 Energy Grid Management Agent - Main Streamlit Application
+
+Performance notes:
+    Every widget interaction reruns this script. The cost of a rerun is the
+    Neo4j round-trip, Plotly figure serialization, CSV encoding and any
+    row-wise pandas work. All of that is I/O and allocation bound, not
+    numeric compute, so Cython/Numba or SIMD-style rewrites do not help.
+    In priority order:
+
+    1. Keep database reads behind the cached query and frame helpers
+       (*_results_frame, vibration_analysis, equipment_type_options).
+    2. Keep df.copy(), to_csv and similar re-encoding out of rerun paths;
+       use df_to_csv_bytes and build display columns with replace_columns.
+    3. Replace .apply and row loops with vectorized .str / numpy operations.
+    4. Build figures through the cached create_*_chart helpers and render
+       them with render_chart instead of rebuilding them per rerun.
 """
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
+from plotly.colors import qualitative
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import io
 import json
 import logging
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
 from neo4j import GraphDatabase
 from neo4j.exceptions import ServiceUnavailable, AuthError, ClientError
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to the standard library encoder
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional speedup; fall back to string date columns
+    pa = None
+
 from config import Config
-from claude_utils import ClaudeClient
+from claude_utils import ClaudeClient, ClaudeAnalysisError, ANALYSIS_FAILED_PREFIX, parse_dates
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def create_maintenance_chart(maintenance_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
+def _dumps_indented(data: Dict[str, Any]) -> str:
+    """
+    Serialize a dictionary as indented JSON for prompts.
+    
+    Args:
+        data: Dictionary to serialize
+        
+    Returns:
+        JSON string with two-space indentation
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(data, indent=2)
+
+def render_chart(fig: Optional[go.Figure]) -> None:
+    """
+    Render a chart returned by the cached create_*_chart helpers.
+    
+    Args:
+        fig: Plotly figure or None if there was no data
+    """
+    # Pass the Figure itself: a dict would be rebuilt and re-validated by st.plotly_chart
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+
+def records_to_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build a dtype-normalized DataFrame from query records.
+    
+    Not cached itself: hashing the raw records would cost a deep walk per call
+    and fails on neo4j.time.DateTime values. Cache through the query-keyed
+    *_results_frame helpers instead.
+    
+    Args:
+        records: List of records returned by EnergyAgentTools
+        
+    Returns:
+        DataFrame with parsed maintenance dates and categorical label columns
+    """
+    if not records:
+        return pd.DataFrame()
+    
+    # Query rows share one key set, so take the columns from the first record
+    # instead of letting pandas union and infer them row by row
+    df = pd.DataFrame.from_records(records, columns=list(records[0].keys()))
+    
+    if 'maintenance_date' in df.columns:
+        df['maintenance_date'] = parse_dates(df['maintenance_date'])
+    
+    # Low-cardinality label columns group and count on integer codes as categoricals
+    for col in ('equipment_type', 'equipment_criticality', 'maintenance_type', 'equipment_location'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    return df
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """
+    Encode a results frame as CSV once per distinct frame for download buttons.
+    
+    Args:
+        df: Results frame to export
+        
+    Returns:
+        UTF-8 encoded CSV without the index, byte-for-byte what df.to_csv writes
+    """
+    # pandas' writer on purpose: Arrow's CSV writer quotes every string and
+    # header and renders floats, booleans and timestamps differently.
+    # Write in row chunks straight to a byte buffer, so the full CSV never also
+    # exists as a Python str waiting to be encoded
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, encoding='utf-8', chunksize=50_000)
+    return buffer.getvalue()
+
+def get_session_timestamp() -> str:
+    """
+    Return the download file-name timestamp, fixed once per browser session.
+    
+    Returns:
+        Timestamp formatted as YYYYMMDD_HHMMSS
+    """
+    if 'session_timestamp' not in st.session_state:
+        st.session_state.session_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return st.session_state.session_timestamp
+
+# Raw data tables render at most this many rows; CSV downloads always carry the full frame
+MAX_DISPLAY_ROWS = 1000
+
+def replace_columns(df: pd.DataFrame, columns: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Return a view of a frame with some columns swapped out, e.g. for display formatting.
+    
+    Unlike df.copy() or df.assign(), which deep-copy every column without
+    copy-on-write, untouched columns keep sharing memory with the original.
+    
+    Args:
+        df: Source frame (left unmodified)
+        columns: Replacement values keyed by column name
+        
+    Returns:
+        Shallow copy of df with the given columns replaced
+    """
+    result = df.copy(deep=False)
+    for name, values in columns.items():
+        result[name] = values
+    return result
+
+def category_stats(labels: pd.Series, values: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Count rows and average a value per label from a single factorization.
+    
+    Args:
+        labels: Grouping column (e.g., equipment_type)
+        values: Numeric column to average per label (optional)
+        
+    Returns:
+        DataFrame indexed by label with a count column, plus a mean column
+        (NaN for labels without values) when values are given
+    """
+    codes, uniques = pd.factorize(labels, sort=True)
+    size = len(uniques)
+    valid = codes >= 0
+    stats = {"count": np.bincount(codes[valid], minlength=size)}
+    
+    if values is not None:
+        numbers = values.to_numpy(dtype='float64', na_value=np.nan)
+        present = valid & ~np.isnan(numbers)
+        value_counts = np.bincount(codes[present], minlength=size)
+        sums = np.bincount(codes[present], weights=numbers[present], minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats["mean"] = sums / value_counts
+    
+    return pd.DataFrame(stats, index=pd.Index(np.asarray(uniques), name=labels.name))
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def summarize_maintenance(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compute the grouped counts behind the equipment analysis charts once per frame.
+    
+    Args:
+        df: Maintenance records frame from records_to_frame
+        
+    Returns:
+        Dictionary with type_counts, monthly_counts and maint_type_counts
+        (None for any count whose source column is missing)
+    """
+    summary = {"type_counts": None, "monthly_counts": None, "maint_type_counts": None}
+    
+    if 'equipment_type' in df.columns:
+        summary["type_counts"] = df['equipment_type'].value_counts()
+    
+    if 'maintenance_date' in df.columns:
+        # Bucket by calendar month on the datetime index (empty months count as 0)
+        dated = df.dropna(subset=['maintenance_date']).set_index('maintenance_date')
+        summary["monthly_counts"] = dated.resample('MS').size().rename('count').reset_index()
+    
+    if 'maintenance_type' in df.columns:
+        summary["maint_type_counts"] = df['maintenance_type'].value_counts()
+    
+    return summary
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def summarize_vibration(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compute the vibration page metrics in a single aggregation pass per frame.
+    
+    Args:
+        df: Vibration records frame from vibration_analysis
+        
+    Returns:
+        Dictionary with issue_count, affected_equipment, equipment_types and the
+        avg/min/max/total maintenance cost (0 for any missing column)
+    """
+    metric_aggs = {
+        'equipment_id': ['nunique'],
+        'equipment_type': ['nunique'],
+        'maintenance_cost': ['mean', 'min', 'max', 'sum']
+    }
+    present = {col: funcs for col, funcs in metric_aggs.items() if col in df.columns}
+    stats = df.agg(present) if present else pd.DataFrame()
+    
+    def stat(func: str, col: str) -> float:
+        if col not in stats.columns or pd.isna(stats.at[func, col]):
+            return 0
+        return stats.at[func, col]
+    
+    return {
+        "issue_count": len(df),
+        "affected_equipment": int(stat('nunique', 'equipment_id')),
+        "equipment_types": int(stat('nunique', 'equipment_type')),
+        "avg_cost": float(stat('mean', 'maintenance_cost')),
+        "min_cost": float(stat('min', 'maintenance_cost')),
+        "max_cost": float(stat('max', 'maintenance_cost')),
+        "total_cost": float(stat('sum', 'maintenance_cost'))
+    }
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_maintenance_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     """
     Create a bar chart of maintenance by equipment type.
     
     Args:
-        maintenance_data: List of maintenance records
+        df: Maintenance records frame from records_to_frame
         
     Returns:
-        Plotly figure object or None if no data
+        Plotly figure or None if no data
     """
-    if not maintenance_data:
+    if df is None or df.empty:
         return None
     
     try:
-        # Convert to DataFrame
-        df = pd.DataFrame(maintenance_data)
-        
         # Check if required columns exist
         if 'equipment_type' not in df.columns:
             return None
         
-        # Count maintenance by equipment type
-        type_counts = df['equipment_type'].value_counts()
+        # Count maintenance by equipment type on the raw arrays
+        types = df['equipment_type']
+        if isinstance(types.dtype, pd.CategoricalDtype):
+            codes = types.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(types.cat.categories))
+            labels = types.cat.categories.to_numpy()
+        else:
+            labels, counts = np.unique(types.dropna().to_numpy(), return_counts=True)
+        
+        # Most frequent first, dropping unobserved categories
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        labels, counts = labels[order], counts[order]
         
-        if type_counts.empty:
+        if len(counts) == 0:
             return None
         
         # Create bar chart
         fig = go.Figure()
         
         fig.add_trace(go.Bar(
-            x=type_counts.index,
-            y=type_counts.values,
-            marker=dict(
-                color=type_counts.values,
-                colorscale='viridis',
-                showscale=True,
-                colorbar=dict(title="Maintenance Count")
-            ),
+            x=labels,
+            y=counts,
+            marker_color='#2c7fb8',
             hovertemplate=(
                 "<b>Equipment Type:</b> %{x}<br>" +
                 "<b>Maintenance Count:</b> %{y}<br>" +
@@ -98,23 +327,22 @@ def create_maintenance_chart(maintenance_data: List[Dict[str, Any]]) -> Optional
         logger.error(f"Error creating maintenance chart: {e}")
         return None
 
-def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_risk_chart(df: pd.DataFrame, risk_threshold: Optional[float] = None) -> Optional[go.Figure]:
     """
     Create a scatter plot of risk scores vs equipment types.
     
     Args:
-        risk_data: List of risk assessment records
+        df: Risk assessment records frame from records_to_frame
+        risk_threshold: Draw a dashed threshold line at this score (optional)
         
     Returns:
-        Plotly figure object or None if no data
+        Plotly figure or None if no data
     """
-    if not risk_data:
+    if df is None or df.empty:
         return None
     
     try:
-        # Convert to DataFrame
-        df = pd.DataFrame(risk_data)
-        
         # Check if required columns exist
         if 'equipment_type' not in df.columns or 'risk_score' not in df.columns:
             return None
@@ -133,37 +361,49 @@ def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
             'Low': 5
         }
         
-        df['size'] = df.get('equipment_criticality', 'Medium').map(criticality_size_map).fillna(10)
+        # Resolve optional columns once instead of per-trace df.get fallbacks
+        if 'equipment_criticality' in df.columns:
+            # One size per category, gathered by code; the trailing default
+            # doubles as the slot for missing values (code -1)
+            criticality = df['equipment_criticality'].astype('category')
+            size_lut = np.array(
+                [criticality_size_map.get(c, 10) for c in criticality.cat.categories] + [10],
+                dtype=np.int8
+            )
+            sizes = size_lut[criticality.cat.codes.to_numpy()]
+        else:
+            sizes = np.full(len(df), 10)
+        names = df['equipment_name'] if 'equipment_name' in df.columns else pd.Series([''] * len(df), index=df.index)
+        
+        # Per-point hover fields so a single trace covers every equipment type
+        customdata = df.reindex(columns=['equipment_type', 'equipment_criticality']).astype(object).fillna('Unknown').to_numpy()
         
         # Create scatter plot
         fig = go.Figure()
         
-        # Group by equipment type for better visualization
-        for eq_type in df['equipment_type'].unique():
-            type_data = df[df['equipment_type'] == eq_type]
-            
-            fig.add_trace(go.Scatter(
-                x=[eq_type] * len(type_data),
-                y=type_data['risk_score'],
-                mode='markers',
-                marker=dict(
-                    size=type_data['size'],
-                    color=type_data['risk_score'],
-                    colorscale='reds',
-                    showscale=True,
-                    colorbar=dict(title="Risk Score")
-                ),
-                text=type_data.get('equipment_name', ''),
-                hovertemplate=(
-                    "<b>Equipment:</b> %{text}<br>" +
-                    "<b>Type:</b> " + eq_type + "<br>" +
-                    "<b>Risk Score:</b> %{y:.3f}<br>" +
-                    "<b>Criticality:</b> " + type_data.get('equipment_criticality', 'Unknown').iloc[0] + "<br>" +
-                    "<extra></extra>"
-                ),
-                name=eq_type,
-                showlegend=True
-            ))
+        fig.add_trace(go.Scatter(
+            x=df['equipment_type'],
+            y=df['risk_score'],
+            mode='markers',
+            marker=dict(
+                size=sizes,
+                color=df['risk_score'],
+                colorscale='reds',
+                showscale=True,
+                colorbar=dict(title="Risk Score")
+            ),
+            text=names.to_numpy(),
+            customdata=customdata,
+            hovertemplate=(
+                "<b>Equipment:</b> %{text}<br>" +
+                "<b>Type:</b> %{customdata[0]}<br>" +
+                "<b>Risk Score:</b> %{y:.3f}<br>" +
+                "<b>Criticality:</b> %{customdata[1]}<br>" +
+                "<extra></extra>"
+            ),
+            name="Risk Score",
+            showlegend=False
+        ))
         
         # Update layout
         fig.update_layout(
@@ -198,38 +438,43 @@ def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
             )
         )
         
+        # Add threshold line
+        if risk_threshold is not None:
+            fig.add_hline(
+                y=risk_threshold,
+                line_dash="dash",
+                line_color="red",
+                annotation_text=f"Threshold: {risk_threshold}",
+                annotation_position="top right"
+            )
+        
         return fig
         
     except Exception as e:
         logger.error(f"Error creating risk chart: {e}")
         return None
 
-def create_timeline_chart(maintenance_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_timeline_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     """
     Create a timeline scatter plot of maintenance activities.
     
     Args:
-        maintenance_data: List of maintenance records
+        df: Maintenance records frame from records_to_frame
         
     Returns:
-        Plotly figure object or None if no data
+        Plotly figure or None if no data
     """
-    if not maintenance_data:
+    if df is None or df.empty:
         return None
     
     try:
-        # Convert to DataFrame
-        df = pd.DataFrame(maintenance_data)
-        
         # Check if required columns exist
         if 'maintenance_date' not in df.columns:
             return None
         
-        # Convert date column to datetime
-        df['maintenance_date'] = pd.to_datetime(df['maintenance_date'])
-        
-        # Remove rows with missing dates
-        df = df.dropna(subset=['maintenance_date'])
+        # Convert date column to datetime and remove rows with missing dates
+        df = df.assign(maintenance_date=parse_dates(df['maintenance_date'])).dropna(subset=['maintenance_date'])
         
         if df.empty:
             return None
@@ -237,36 +482,56 @@ def create_timeline_chart(maintenance_data: List[Dict[str, Any]]) -> Optional[go
         # Sort by date
         df = df.sort_values('maintenance_date')
         
-        # Create color mapping for equipment types
-        equipment_types = df['equipment_type'].unique() if 'equipment_type' in df.columns else ['Unknown']
-        colors = px.colors.qualitative.Set3[:len(equipment_types)]
-        color_map = dict(zip(equipment_types, colors))
+        # Create color mapping for equipment types, cycling the palette past its 12 colors
+        if 'equipment_type' in df.columns:
+            type_col = df['equipment_type'].astype('category')
+            if type_col.isna().any():
+                type_col = type_col.cat.add_categories('Unknown').fillna('Unknown')
+        else:
+            type_col = pd.Series('Unknown', index=df.index, dtype='category')
+        equipment_types = type_col.cat.categories
+        palette = np.array(qualitative.Set3, dtype=object)
+        type_colors = palette[np.arange(len(equipment_types)) % len(palette)]
+        color_map = dict(zip(equipment_types, type_colors))
+        
+        # Resolve per-point colors and hover fields once
+        names = df['equipment_name'] if 'equipment_name' in df.columns else pd.Series([''] * len(df), index=df.index)
+        point_colors = type_colors[type_col.cat.codes.to_numpy()]
+        customdata = df.reindex(columns=['equipment_type', 'maintenance_type']).astype(object).fillna('Unknown').to_numpy()
         
         # Create scatter plot
         fig = go.Figure()
         
-        # Group by equipment type for better visualization
+        # Single timeline trace with colors mapped per point
+        fig.add_trace(go.Scatter(
+            x=df['maintenance_date'],
+            y=np.ones(len(df)),  # Single line for timeline
+            mode='markers+lines',
+            marker=dict(
+                size=8,
+                color=point_colors,
+                line=dict(width=2, color='white')
+            ),
+            line=dict(color='#bdc3c7', width=2),
+            text=names.to_numpy(),
+            customdata=customdata,
+            hovertemplate=(
+                "<b>Equipment:</b> %{text}<br>" +
+                "<b>Type:</b> %{customdata[0]}<br>" +
+                "<b>Date:</b> %{x}<br>" +
+                "<b>Maintenance:</b> %{customdata[1]}<br>" +
+                "<extra></extra>"
+            ),
+            showlegend=False
+        ))
+        
+        # Legend-only entries (no points) keep the equipment type color key
         for eq_type in equipment_types:
-            type_data = df[df['equipment_type'] == eq_type]
-            
             fig.add_trace(go.Scatter(
-                x=type_data['maintenance_date'],
-                y=[1] * len(type_data),  # Single line for timeline
-                mode='markers+lines',
-                marker=dict(
-                    size=8,
-                    color=color_map[eq_type],
-                    line=dict(width=2, color='white')
-                ),
-                line=dict(color=color_map[eq_type], width=2),
-                text=type_data.get('equipment_name', ''),
-                hovertemplate=(
-                    "<b>Equipment:</b> %{text}<br>" +
-                    "<b>Type:</b> " + eq_type + "<br>" +
-                    "<b>Date:</b> %{x}<br>" +
-                    "<b>Maintenance:</b> " + type_data.get('maintenance_type', 'Unknown').iloc[0] + "<br>" +
-                    "<extra></extra>"
-                ),
+                x=[None],
+                y=[None],
+                mode='markers',
+                marker=dict(size=8, color=color_map[eq_type]),
                 name=eq_type,
                 showlegend=True
             ))
@@ -310,6 +575,472 @@ def create_timeline_chart(maintenance_data: List[Dict[str, Any]]) -> Optional[go
         logger.error(f"Error creating timeline chart: {e}")
         return None
 
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_count_bar_chart(
+    counts: pd.Series,
+    title: str,
+    x_title: str,
+    y_title: str,
+    colorscale: str = 'viridis'
+) -> Optional[go.Figure]:
+    """
+    Create a bar chart from a pre-aggregated Series, colored by value.
+    
+    Args:
+        counts: Values indexed by category (e.g., counts or averages per type)
+        title: Chart title
+        x_title: X axis title
+        y_title: Y axis title
+        colorscale: Plotly colorscale for the bar colors
+        
+    Returns:
+        Plotly figure or None if no data
+    """
+    if counts is None or counts.empty:
+        return None
+    
+    try:
+        values = counts.to_numpy()
+        fig = go.Figure(go.Bar(
+            x=counts.index.astype(str),
+            y=values,
+            marker=dict(color=values, colorscale=colorscale, showscale=True)
+        ))
+        fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, showlegend=False)
+        return fig
+        
+    except Exception as e:
+        logger.error(f"Error creating bar chart: {e}")
+        return None
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_monthly_line_chart(
+    monthly_counts: pd.DataFrame,
+    title: str = "Maintenance Activities Timeline",
+    y_title: str = "Maintenance Count"
+) -> Optional[go.Figure]:
+    """
+    Create a line chart of maintenance counts per month.
+    
+    Args:
+        monthly_counts: Frame with maintenance_date (month start) and count columns
+            from summarize_maintenance
+        title: Chart title
+        y_title: Y axis title
+        
+    Returns:
+        Plotly figure or None if no data
+    """
+    if monthly_counts is None or monthly_counts.empty:
+        return None
+    
+    try:
+        fig = go.Figure(go.Scatter(
+            x=monthly_counts['maintenance_date'],
+            y=monthly_counts['count'],
+            mode='lines+markers'
+        ))
+        fig.update_layout(
+            title=title,
+            xaxis_title="Month",
+            yaxis_title=y_title
+        )
+        fig.update_xaxes(tickangle=45)
+        return fig
+        
+    except Exception as e:
+        logger.error(f"Error creating monthly chart: {e}")
+        return None
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_distribution_pie_chart(counts: pd.Series, title: str) -> Optional[go.Figure]:
+    """
+    Create a pie chart from pre-aggregated counts.
+    
+    Args:
+        counts: Counts indexed by category
+        title: Chart title
+        
+    Returns:
+        Plotly figure or None if no data
+    """
+    if counts is None or counts.empty:
+        return None
+    
+    try:
+        fig = go.Figure(go.Pie(labels=counts.index.astype(str), values=counts.to_numpy()))
+        fig.update_layout(title=title)
+        return fig
+        
+    except Exception as e:
+        logger.error(f"Error creating pie chart: {e}")
+        return None
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def create_histogram_chart(
+    values: pd.Series,
+    title: str,
+    x_title: str,
+    y_title: str,
+    color: Optional[str] = None,
+    threshold: Optional[float] = None,
+    nbins: int = 20
+) -> Optional[go.Figure]:
+    """
+    Create a histogram of a numeric column.
+    
+    Args:
+        values: Numeric column to bin
+        title: Chart title
+        x_title: X axis title
+        y_title: Y axis title
+        color: Bar color (optional, Plotly default otherwise)
+        threshold: Draw a dashed threshold line at this x value (optional)
+        nbins: Maximum number of bins
+        
+    Returns:
+        Plotly figure or None if no data
+    """
+    if values is None or values.empty:
+        return None
+    
+    try:
+        fig = go.Figure(go.Histogram(x=values, nbinsx=nbins, marker_color=color))
+        fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, showlegend=False)
+        
+        if threshold is not None:
+            fig.add_vline(
+                x=threshold,
+                line_dash="dash",
+                line_color="red",
+                annotation_text=f"Threshold: {threshold}"
+            )
+        
+        return fig
+        
+    except Exception as e:
+        logger.error(f"Error creating histogram: {e}")
+        return None
+
+# Risk score cell styles, one per bucket: < 0.4, 0.4-0.6, 0.6-0.8, >= 0.8
+RISK_SCORE_BINS = [-np.inf, 0.4, 0.6, 0.8, np.inf]
+RISK_SCORE_STYLES = [
+    'background-color: #90EE90; color: black',
+    'background-color: #ffff00; color: black',
+    'background-color: #ffaa00; color: black; font-weight: bold',
+    'background-color: #ff4444; color: white; font-weight: bold'
+]
+
+def style_risk_scores(scores: pd.Series) -> List[str]:
+    """
+    Color-code a risk score column for Styler.apply in one vectorized pass.
+    
+    Args:
+        scores: Risk score column
+        
+    Returns:
+        CSS style per cell, empty for missing scores
+    """
+    styles = pd.cut(scores, bins=RISK_SCORE_BINS, labels=RISK_SCORE_STYLES, right=False, ordered=False)
+    return styles.astype(object).fillna('').to_list()
+
+# Partial reruns: st.fragment (Streamlit >= 1.37, experimental_fragment from 1.33)
+# reruns only the decorated panel when its own widgets change; older versions
+# render the panel as a plain function
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+@_fragment
+def show_maintenance_chart_panel(df: pd.DataFrame) -> None:
+    """
+    Render the maintenance charts for an already-fetched records frame.
+    
+    Args:
+        df: Maintenance records frame from records_to_frame
+    """
+    chart_view = st.radio(
+        "Chart View",
+        ["Frequency by Equipment Type", "Activities Timeline"],
+        horizontal=True,
+        key="maintenance_chart_view"
+    )
+    
+    if chart_view == "Frequency by Equipment Type":
+        render_chart(create_maintenance_chart(df))
+    else:
+        render_chart(create_timeline_chart(df))
+
+@_fragment
+def show_risk_chart_panel(df: pd.DataFrame) -> None:
+    """
+    Render the risk scatter chart for an already-fetched risk frame.
+    
+    Args:
+        df: Risk assessment records frame from records_to_frame
+    """
+    render_chart(create_risk_chart(df))
+
+@st.cache_resource(show_spinner=False)
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """
+    Create the worker pool that runs Claude requests off the script thread.
+    
+    Returns:
+        ThreadPoolExecutor shared across sessions
+    """
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)  # Cache for 5 minutes
+def equipment_type_options(_tools: "EnergyAgentTools", uri: str, database: str) -> List[str]:
+    """
+    Fetch the equipment types offered by the search filter.
+    
+    Args:
+        _tools: EnergyAgentTools instance used on a cache miss
+        uri: Neo4j database URI
+        database: Neo4j database name
+        
+    Returns:
+        Sorted list of equipment type names
+    """
+    return _tools.get_equipment_types()
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)  # Cache for 5 minutes
+def search_results_frame(
+    _tools: "EnergyAgentTools",
+    uri: str,
+    database: str,
+    equipment_type: Optional[str],
+    issue_type: Optional[str],
+    days_back: int
+) -> pd.DataFrame:
+    """
+    Fetch and frame maintenance search results, keyed on the search inputs.
+    
+    Args:
+        _tools: EnergyAgentTools instance used on a cache miss
+        uri: Neo4j database URI
+        database: Neo4j database name
+        equipment_type: Equipment type filter
+        issue_type: Issue type filter
+        days_back: Number of days to look back
+        
+    Returns:
+        Records frame as built by records_to_frame
+    """
+    return records_to_frame(_tools.search_equipment_maintenance_records(
+        equipment_type=equipment_type,
+        issue_type=issue_type,
+        days_back=days_back
+    ))
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)  # Cache for 5 minutes
+def risk_results_frame(_tools: "EnergyAgentTools", uri: str, database: str, risk_threshold: float) -> pd.DataFrame:
+    """
+    Fetch and frame risky equipment, keyed on the risk threshold.
+    
+    Args:
+        _tools: EnergyAgentTools instance used on a cache miss
+        uri: Neo4j database URI
+        database: Neo4j database name
+        risk_threshold: Minimum risk score to include
+        
+    Returns:
+        Risk records frame as built by records_to_frame
+    """
+    return records_to_frame(_tools.get_risky_equipment(risk_threshold))
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)  # Cache for 5 minutes
+def dependency_results_frame(_tools: "EnergyAgentTools", uri: str, database: str, installation_id: Optional[str]) -> pd.DataFrame:
+    """
+    Fetch and frame installation dependencies, shared by the dependency and scheduling pages.
+    
+    Args:
+        _tools: EnergyAgentTools instance used on a cache miss
+        uri: Neo4j database URI
+        database: Neo4j database name
+        installation_id: Installation ID filter (None for all installations)
+        
+    Returns:
+        Dependency records frame as built by records_to_frame
+    """
+    return records_to_frame(_tools.get_installation_equipments_dependency(installation_id))
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)  # Cache for 5 minutes
+def vibration_analysis(
+    _tools: "EnergyAgentTools",
+    uri: str,
+    database: str,
+    days_back: int
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Fetch vibration records and their page summary, keyed on the analysis period.
+    
+    Reruns look up one entry keyed on a few scalars instead of hashing the
+    whole frame again for each summary helper.
+    
+    Args:
+        _tools: EnergyAgentTools instance used on a cache miss
+        uri: Neo4j database URI
+        database: Neo4j database name
+        days_back: Number of days to look back
+        
+    Returns:
+        Tuple of the vibration records frame, with maintenance_date parsed,
+        and a summary combining the summarize_maintenance counts with the
+        summarize_vibration metrics (empty when there are no records)
+    """
+    df = _tools.get_vibration_analysis(days_back=days_back, as_df=True)
+    if 'maintenance_date' in df.columns:
+        df = df.assign(maintenance_date=parse_dates(df['maintenance_date']))
+    if df.empty:
+        # Nothing to summarize; the page only shows a "no records" note
+        return df, {}
+    return df, {**summarize_maintenance(df), **summarize_vibration(df)}
+
+def raise_on_failed_analysis(analysis: str) -> str:
+    """
+    Turn the in-band failure string of ClaudeClient.analyze_grid_data into an exception.
+    
+    Args:
+        analysis: Text returned by analyze_grid_data
+        
+    Returns:
+        The analysis unchanged when the call succeeded
+        
+    Raises:
+        ClaudeAnalysisError: If the client reported a failed API call
+    """
+    if analysis.startswith(ANALYSIS_FAILED_PREFIX):
+        raise ClaudeAnalysisError(analysis[len(ANALYSIS_FAILED_PREFIX):].strip())
+    return analysis
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)  # Cache for 10 minutes
+def cached_maintenance_analysis(
+    _tools: "EnergyAgentTools",
+    _client: ClaudeClient,
+    uri: str,
+    database: str,
+    equipment_type: Optional[str],
+    issue_type: Optional[str],
+    days_back: int
+) -> str:
+    """
+    Run the Claude analysis for a search, keyed on the search inputs.
+    
+    The records are fully determined by the connection and filters, so the key
+    is a handful of scalars instead of a deep hash of every record.
+    
+    Args:
+        _tools: EnergyAgentTools instance used on a cache miss
+        _client: ClaudeClient instance used on a cache miss
+        uri: Neo4j database URI
+        database: Neo4j database name
+        equipment_type: Equipment type filter used by the search
+        issue_type: Issue type filter used by the search
+        days_back: Number of days the search looked back
+        
+    Returns:
+        AI-generated analysis of the matching maintenance records
+        
+    Raises:
+        ClaudeAnalysisError: If the Claude call failed, so the failure is not cached
+    """
+    records = _tools.search_equipment_maintenance_records(
+        equipment_type=equipment_type,
+        issue_type=issue_type,
+        days_back=days_back
+    )
+    if not records:
+        return "No maintenance records available for analysis."
+    return raise_on_failed_analysis(_client.analyze_grid_data(_tools.build_maintenance_prompt(records)))
+
+def show_maintenance_analysis(filters: Dict[str, Any]) -> None:
+    """
+    Render the Claude analysis section; the API call only starts from its button.
+    
+    Args:
+        filters: Search filters of the records to analyze
+    """
+    st.subheader("🤖 AI-Powered Analysis")
+    
+    if not st.session_state.claude_client:
+        st.warning("⚠️ Claude AI client not available. Please check your API key in the sidebar.")
+        return
+    
+    if st.button("🧠 Analyze with Claude AI", type="secondary", key="analyze_maintenance"):
+        with st.spinner("Claude AI is analyzing maintenance patterns..."):
+            try:
+                # Cached per search; failures are not cached, so a retry calls Claude again
+                tools = st.session_state.energy_tools
+                analysis = cached_maintenance_analysis(
+                    tools,
+                    st.session_state.claude_client,
+                    tools.uri,
+                    tools.database,
+                    **filters
+                )
+                
+                st.success("✅ AI Analysis Complete!")
+                
+                # Display analysis in a nice format
+                st.markdown("### 📊 Maintenance Pattern Analysis")
+                st.markdown(analysis)
+                
+                # Store analysis in session state for potential export
+                st.session_state.last_analysis = {
+                    "timestamp": datetime.now(),
+                    "filters": filters,
+                    "analysis": analysis
+                }
+                
+            except Exception as e:
+                st.error(f"❌ AI Analysis failed: {e}")
+
+def _driver_alive(driver) -> bool:
+    """
+    Check a shared driver can still reach the database before reusing it.
+    
+    Args:
+        driver: Neo4j driver from get_driver
+        
+    Returns:
+        True if the driver is connected, False to have the cache rebuild it
+    """
+    # neo4j 5.x only warns when a closed driver is used, so check explicitly
+    if getattr(driver, "_closed", False) is True:
+        return False
+    try:
+        driver.verify_connectivity()
+        return True
+    except Exception as e:
+        logger.warning(f"Discarding unusable Neo4j driver: {e}")
+        return False
+
+@st.cache_resource(show_spinner=False, validate=_driver_alive)
+def get_driver(uri: str, username: str, password: str, database: str):
+    """
+    Create the pooled Neo4j driver once per connection and share it across reruns.
+    
+    Args:
+        uri: Neo4j database URI
+        username: Neo4j username
+        password: Neo4j password
+        database: Neo4j database name used for the connectivity check
+        
+    Returns:
+        Connected Neo4j driver
+    """
+    driver = GraphDatabase.driver(
+        uri,
+        auth=(username, password),
+        max_connection_pool_size=50,
+        connection_timeout=30
+    )
+    # Test connection
+    with driver.session(database=database) as session:
+        session.run("RETURN 1")
+    return driver
+
 class EnergyAgentTools:
     """Handles Neo4j database operations for energy grid management."""
     
@@ -337,30 +1068,62 @@ class EnergyAgentTools:
     def _connect(self):
         """Establish connection to Neo4j database."""
         try:
-            self.driver = GraphDatabase.driver(
-                self.uri,
-                auth=(self.username, self.password),
-                max_connection_pool_size=50,
-                connection_timeout=30
-            )
-            # Test connection
-            with self.driver.session(database=self.database) as session:
-                session.run("RETURN 1")
+            self.driver = get_driver(self.uri, self.username, self.password, self.database)
             logger.info("Successfully connected to Neo4j database")
         except (ServiceUnavailable, AuthError, ClientError) as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
             raise ConnectionError(f"Neo4j connection failed: {e}")
     
-    def _execute_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def _maintenance_match(
+        self,
+        issue_type: Optional[str],
+        parameters: Dict[str, Any],
+        equipment_type: Optional[str] = None
+    ) -> str:
+        """
+        Build the MATCH/WHERE head shared by the maintenance record queries.
+        
+        A supplied equipment type is written as a property predicate in the
+        pattern so the planner can seek the Equipment(type) index.
+        
+        Args:
+            issue_type: Issue text to find in maintenance descriptions (optional)
+            parameters: Query parameters, updated with the filter values
+            equipment_type: Filter by equipment type (optional)
+            
+        Returns:
+            Cypher MATCH clause with the date window already in its WHERE
+        """
+        equipment_pattern = "(e:Equipment)"
+        if equipment_type:
+            equipment_pattern = "(e:Equipment {type: $equipment_type})"
+            parameters["equipment_type"] = equipment_type
+        
+        query = f"""
+        MATCH {equipment_pattern}-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
+        WHERE m.date >= date() - duration({{days: $days_back}})
+        """
+        if issue_type:
+            query += " AND toLower(m.description) CONTAINS toLower($issue_type)"
+            parameters["issue_type"] = issue_type
+        return query
+    
+    def _execute_query(self, query: str, parameters: Dict[str, Any] = None, as_df: bool = False) -> Union[List[Dict[str, Any]], pd.DataFrame]:
         """
         Execute a Cypher query and return results.
         
         Args:
             query: Cypher query string
             parameters: Query parameters
+            as_df: Build a DataFrame straight from the result stream instead of
+                materializing one dict per record
             
         Returns:
-            List of dictionaries containing query results
+            List of dictionaries containing query results, or a DataFrame if as_df
+            
+        Raises:
+            RuntimeError: If the query fails; callers above the caches let it
+                propagate so a failed read is never cached as an empty result
         """
         if parameters is None:
             parameters = {}
@@ -368,6 +1131,8 @@ class EnergyAgentTools:
         try:
             with self.driver.session(database=self.database) as session:
                 result = session.run(query, parameters)
+                if as_df:
+                    return result.to_df(parse_dates=True)
                 return [dict(record) for record in result]
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
@@ -379,8 +1144,9 @@ class EnergyAgentTools:
         self, 
         equipment_type: Optional[str] = None,
         issue_type: Optional[str] = None,
-        days_back: int = 365
-    ) -> List[Dict[str, Any]]:
+        days_back: int = 365,
+        as_df: bool = False
+    ) -> Union[List[Dict[str, Any]], pd.DataFrame]:
         """
         Search maintenance records with filters.
         
@@ -388,27 +1154,15 @@ class EnergyAgentTools:
             equipment_type: Filter by equipment type (e.g., "Generator", "Transformer")
             issue_type: Filter by issue type (e.g., "vibration", "overheating")
             days_back: Number of days to look back (default: 365)
+            as_df: Return a DataFrame built directly from the driver result
             
         Returns:
-            List of maintenance records with equipment details
+            List of maintenance records with equipment details (DataFrame if as_df)
         """
-        # Build the Cypher query with optional filters
-        query = """
-        MATCH (e:Equipment)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
-        WHERE m.date >= date() - duration({days: $days_back})
-        """
-        
         parameters = {"days_back": days_back}
         
-        # Add equipment type filter
-        if equipment_type:
-            query += " AND e.type = $equipment_type"
-            parameters["equipment_type"] = equipment_type
-        
-        # Add issue type filter (search in description)
-        if issue_type:
-            query += " AND toLower(m.description) CONTAINS toLower($issue_type)"
-            parameters["issue_type"] = issue_type
+        # Build the Cypher query; the issue type filter searches descriptions
+        query = self._maintenance_match(issue_type, parameters, equipment_type)
         
         # Complete the query
         query += """
@@ -424,23 +1178,37 @@ class EnergyAgentTools:
         ORDER BY m.date DESC
         """
         
-        try:
-            results = self._execute_query(query, parameters)
-            logger.info(f"Found {len(results)} maintenance records")
-            return results
-        except Exception as e:
-            logger.error(f"Failed to search maintenance records: {e}")
-            return []
+        results = self._execute_query(query, parameters, as_df=as_df)
+        logger.info(f"Found {len(results)} maintenance records")
+        return results
+    
+    def get_equipment_types(self) -> List[str]:
+        """
+        Get the distinct equipment types for the search filters.
+        
+        Returns:
+            Sorted list of equipment type names
+        """
+        query = """
+        MATCH (e:Equipment)
+        WHERE e.type IS NOT NULL
+        RETURN DISTINCT e.type as equipment_type
+        ORDER BY equipment_type
+        """
+        
+        results = self._execute_query(query)
+        return [record["equipment_type"] for record in results]
     
-    def get_risky_equipment(self, risk_threshold: float = 0.7) -> List[Dict[str, Any]]:
+    def get_risky_equipment(self, risk_threshold: float = 0.7, as_df: bool = False) -> Union[List[Dict[str, Any]], pd.DataFrame]:
         """
         Get equipment with high risk scores above a threshold.
         
         Args:
             risk_threshold: Minimum risk score to include (0.0-1.0, default: 0.7)
+            as_df: Return a DataFrame built directly from the driver result
             
         Returns:
-            List of equipment with risk assessments
+            List of equipment with risk assessments (DataFrame if as_df)
         """
         query = """
         MATCH (e:Equipment)-[:HAS_RISK_ASSESSMENT]->(r:RiskAssessment)
@@ -458,13 +1226,9 @@ class EnergyAgentTools:
         
         parameters = {"risk_threshold": risk_threshold}
         
-        try:
-            results = self._execute_query(query, parameters)
-            logger.info(f"Found {len(results)} high-risk equipment items")
-            return results
-        except Exception as e:
-            logger.error(f"Failed to get risky equipment: {e}")
-            return []
+        results = self._execute_query(query, parameters, as_df=as_df)
+        logger.info(f"Found {len(results)} high-risk equipment items")
+        return results
     
     def get_installation_equipments_dependency(self, installation_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -478,75 +1242,68 @@ class EnergyAgentTools:
         """
         if installation_id:
             # Query for specific installation
-            query = """
-            MATCH (i:Installation {id: $installation_id})-[:CONTAINS]->(e:Equipment)
-            OPTIONAL MATCH (e)-[:DEPENDS_ON]->(d:Equipment)
-            OPTIONAL MATCH (e)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
-            OPTIONAL MATCH (e)-[:HAS_RISK_ASSESSMENT]->(r:RiskAssessment)
-            RETURN i.id as installation_id,
-                   i.name as installation_name,
-                   i.type as installation_type,
-                   e.id as equipment_id,
-                   e.type as equipment_type,
-                   e.name as equipment_name,
-                   e.criticality as equipment_criticality,
-                   collect(DISTINCT d.id) as dependent_equipment,
-                   collect(DISTINCT {date: m.date, type: m.type, description: m.description}) as maintenance_history,
-                   r.risk_score as current_risk_score
-            ORDER BY e.criticality DESC
-            """
+            match_clause = "MATCH (i:Installation {id: $installation_id})-[:CONTAINS]->(e:Equipment)"
+            order_clause = "ORDER BY e.criticality DESC"
             parameters = {"installation_id": installation_id}
         else:
             # Query for all installations
-            query = """
-            MATCH (i:Installation)-[:CONTAINS]->(e:Equipment)
-            OPTIONAL MATCH (e)-[:DEPENDS_ON]->(d:Equipment)
-            OPTIONAL MATCH (e)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
-            OPTIONAL MATCH (e)-[:HAS_RISK_ASSESSMENT]->(r:RiskAssessment)
-            RETURN i.id as installation_id,
-                   i.name as installation_name,
-                   i.type as installation_type,
-                   e.id as equipment_id,
-                   e.type as equipment_type,
-                   e.name as equipment_name,
-                   e.criticality as equipment_criticality,
-                   collect(DISTINCT d.id) as dependent_equipment,
-                   collect(DISTINCT {date: m.date, type: m.type, description: m.description}) as maintenance_history,
-                   r.risk_score as current_risk_score
-            ORDER BY i.name, e.criticality DESC
-            """
+            match_clause = "MATCH (i:Installation)-[:CONTAINS]->(e:Equipment)"
+            order_clause = "ORDER BY i.name, e.criticality DESC"
             parameters = {}
         
-        try:
-            results = self._execute_query(query, parameters)
-            logger.info(f"Found {len(results)} installation-equipment dependencies")
-            return results
-        except Exception as e:
-            logger.error(f"Failed to get installation dependencies: {e}")
-            return []
+        # Each relationship is aggregated in its own subquery so dependents,
+        # maintenance rows and risk assessments never form a cartesian product
+        query = f"""
+        {match_clause}
+        CALL {{
+            WITH e
+            MATCH (e)-[:DEPENDS_ON]->(d:Equipment)
+            RETURN collect(DISTINCT d.id) as dependent_equipment
+        }}
+        CALL {{
+            WITH e
+            MATCH (e)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
+            RETURN collect({{date: m.date, type: m.type, description: m.description}}) as maintenance_history
+        }}
+        CALL {{
+            WITH e
+            OPTIONAL MATCH (e)-[:HAS_RISK_ASSESSMENT]->(r:RiskAssessment)
+            RETURN r.risk_score as current_risk_score
+            ORDER BY r.assessment_date DESC
+            LIMIT 1
+        }}
+        RETURN i.id as installation_id,
+               i.name as installation_name,
+               i.type as installation_type,
+               e.id as equipment_id,
+               e.type as equipment_type,
+               e.name as equipment_name,
+               e.criticality as equipment_criticality,
+               dependent_equipment,
+               maintenance_history,
+               current_risk_score
+        {order_clause}
+        """
+        
+        results = self._execute_query(query, parameters)
+        logger.info(f"Found {len(results)} installation-equipment dependencies")
+        return results
     
-    def get_vibration_analysis(self, equipment_type: Optional[str] = None, days_back: int = 90) -> List[Dict[str, Any]]:
+    def get_vibration_analysis(self, equipment_type: Optional[str] = None, days_back: int = 90, as_df: bool = False) -> Union[List[Dict[str, Any]], pd.DataFrame]:
         """
         Get vibration-related maintenance records and analysis.
         
         Args:
             equipment_type: Filter by equipment type
             days_back: Number of days to look back
+            as_df: Return a DataFrame built directly from the driver result
             
         Returns:
-            List of vibration-related maintenance records
-        """
-        query = """
-        MATCH (e:Equipment)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
-        WHERE m.date >= date() - duration({days: $days_back})
-        AND toLower(m.description) CONTAINS 'vibration'
+            List of vibration-related maintenance records (DataFrame if as_df)
         """
-        
         parameters = {"days_back": days_back}
         
-        if equipment_type:
-            query += " AND e.type = $equipment_type"
-            parameters["equipment_type"] = equipment_type
+        query = self._maintenance_match("vibration", parameters, equipment_type)
         
         query += """
         RETURN e.id as equipment_id,
@@ -561,13 +1318,9 @@ class EnergyAgentTools:
         ORDER BY m.date DESC
         """
         
-        try:
-            results = self._execute_query(query, parameters)
-            logger.info(f"Found {len(results)} vibration-related maintenance records")
-            return results
-        except Exception as e:
-            logger.error(f"Failed to get vibration analysis: {e}")
-            return []
+        results = self._execute_query(query, parameters, as_df=as_df)
+        logger.info(f"Found {len(results)} vibration-related maintenance records")
+        return results
     
     def generate_maintenance_schedule(self, equipment_ids: List[str] = None, days_ahead: int = 30) -> List[Dict[str, Any]]:
         """
@@ -595,8 +1348,6 @@ class EnergyAgentTools:
             parameters = {}
         
         query += """
-        OPTIONAL MATCH (e)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
-        WHERE m.date >= date() - duration({days: 90})
         RETURN e.id as equipment_id,
                e.type as equipment_type,
                e.name as equipment_name,
@@ -604,7 +1355,10 @@ class EnergyAgentTools:
                e.criticality as equipment_criticality,
                r.risk_score as risk_score,
                r.risk_factors as risk_factors,
-               count(m) as recent_maintenance_count,
+               COUNT {
+                   (e)-[:HAS_MAINTENANCE]->(m:MaintenanceRecord)
+                   WHERE m.date >= date() - duration({days: 90})
+               } as recent_maintenance_count,
                date() + duration({days: 7}) as recommended_date,
                CASE 
                    WHEN r.risk_score >= 0.8 THEN 'High Priority'
@@ -614,13 +1368,89 @@ class EnergyAgentTools:
         ORDER BY r.risk_score DESC
         """
         
-        try:
-            results = self._execute_query(query, parameters)
-            logger.info(f"Generated maintenance schedule for {len(results)} equipment items")
-            return results
-        except Exception as e:
-            logger.error(f"Failed to generate maintenance schedule: {e}")
-            return []
+        results = self._execute_query(query, parameters)
+        logger.info(f"Generated maintenance schedule for {len(results)} equipment items")
+        return results
+    
+    def build_maintenance_prompt(self, maintenance_records: List[Dict[str, Any]]) -> str:
+        """
+        Build the Claude prompt summarizing a set of maintenance records.
+        
+        Args:
+            maintenance_records: List of maintenance records to summarize
+            
+        Returns:
+            Analysis prompt text
+        """
+        # Prepare data for analysis
+        df = records_to_frame(maintenance_records)
+        
+        # Create summary statistics (one reduction pass per column)
+        total_records = len(maintenance_records)
+        type_counts = df['equipment_type'].value_counts(sort=False) if 'equipment_type' in df.columns else pd.Series(dtype='int64')
+        maint_type_counts = df['maintenance_type'].value_counts(sort=False) if 'maintenance_type' in df.columns else pd.Series(dtype='int64')
+        
+        if 'maintenance_cost' in df.columns:
+            cost_stats = df['maintenance_cost'].agg(['sum', 'mean', 'min', 'max']).to_dict()
+        else:
+            cost_stats = {'sum': 0, 'mean': 0, 'min': 0, 'max': 0}
+        
+        if 'maintenance_date' in df.columns:
+            date_stats = df['maintenance_date'].agg(['min', 'max']).to_dict()
+        else:
+            date_stats = {'min': None, 'max': None}
+        
+        # Analyze patterns
+        patterns = {
+            "total_records": total_records,
+            "equipment_types": len(type_counts),
+            "total_cost": cost_stats['sum'],
+            "date_range": {
+                "earliest": date_stats['min'],
+                "latest": date_stats['max']
+            },
+            "equipment_type_distribution": type_counts.to_dict(),
+            "maintenance_type_distribution": maint_type_counts.to_dict(),
+            "cost_analysis": {
+                "average_cost": cost_stats['mean'],
+                "max_cost": cost_stats['max'],
+                "min_cost": cost_stats['min']
+            }
+        }
+        
+        # Create analysis prompt
+        analysis_prompt = f"""
+        Analyze the following maintenance records data for an energy grid management system:
+        
+        Summary Statistics:
+        - Total Records: {patterns['total_records']}
+        - Equipment Types: {patterns['equipment_types']}
+        - Total Cost: ${patterns['total_cost']:,.2f}
+        - Date Range: {patterns['date_range']['earliest']} to {patterns['date_range']['latest']}
+        
+        Equipment Type Distribution:
+        {_dumps_indented(patterns['equipment_type_distribution'])}
+        
+        Maintenance Type Distribution:
+        {_dumps_indented(patterns['maintenance_type_distribution'])}
+        
+        Cost Analysis:
+        - Average Cost: ${patterns['cost_analysis']['average_cost']:,.2f}
+        - Maximum Cost: ${patterns['cost_analysis']['max_cost']:,.2f}
+        - Minimum Cost: ${patterns['cost_analysis']['min_cost']:,.2f}
+        
+        Please provide a comprehensive analysis including:
+        1. Key patterns and trends in the maintenance data
+        2. Equipment types that require the most attention
+        3. Cost implications and budget considerations
+        4. Recommendations for maintenance optimization
+        5. Potential risk factors and areas of concern
+        6. Suggestions for preventive maintenance strategies
+        
+        Format your response in a clear, structured manner suitable for energy grid management professionals.
+        """
+        
+        return analysis_prompt
     
     def analyze_maintenance_patterns(self, maintenance_records: List[Dict[str, Any]]) -> str:
         """
@@ -636,63 +1466,7 @@ class EnergyAgentTools:
             return "No maintenance records available for analysis."
         
         try:
-            # Prepare data for analysis
-            df = pd.DataFrame(maintenance_records)
-            
-            # Create summary statistics
-            total_records = len(maintenance_records)
-            equipment_types = df['equipment_type'].nunique() if 'equipment_type' in df.columns else 0
-            total_cost = df['maintenance_cost'].sum() if 'maintenance_cost' in df.columns else 0
-            
-            # Analyze patterns
-            patterns = {
-                "total_records": total_records,
-                "equipment_types": equipment_types,
-                "total_cost": total_cost,
-                "date_range": {
-                    "earliest": df['maintenance_date'].min() if 'maintenance_date' in df.columns else None,
-                    "latest": df['maintenance_date'].max() if 'maintenance_date' in df.columns else None
-                },
-                "equipment_type_distribution": df['equipment_type'].value_counts().to_dict() if 'equipment_type' in df.columns else {},
-                "maintenance_type_distribution": df['maintenance_type'].value_counts().to_dict() if 'maintenance_type' in df.columns else {},
-                "cost_analysis": {
-                    "average_cost": df['maintenance_cost'].mean() if 'maintenance_cost' in df.columns else 0,
-                    "max_cost": df['maintenance_cost'].max() if 'maintenance_cost' in df.columns else 0,
-                    "min_cost": df['maintenance_cost'].min() if 'maintenance_cost' in df.columns else 0
-                }
-            }
-            
-            # Create analysis prompt
-            analysis_prompt = f"""
-            Analyze the following maintenance records data for an energy grid management system:
-            
-            Summary Statistics:
-            - Total Records: {patterns['total_records']}
-            - Equipment Types: {patterns['equipment_types']}
-            - Total Cost: ${patterns['total_cost']:,.2f}
-            - Date Range: {patterns['date_range']['earliest']} to {patterns['date_range']['latest']}
-            
-            Equipment Type Distribution:
-            {json.dumps(patterns['equipment_type_distribution'], indent=2)}
-            
-            Maintenance Type Distribution:
-            {json.dumps(patterns['maintenance_type_distribution'], indent=2)}
-            
-            Cost Analysis:
-            - Average Cost: ${patterns['cost_analysis']['average_cost']:,.2f}
-            - Maximum Cost: ${patterns['cost_analysis']['max_cost']:,.2f}
-            - Minimum Cost: ${patterns['cost_analysis']['min_cost']:,.2f}
-            
-            Please provide a comprehensive analysis including:
-            1. Key patterns and trends in the maintenance data
-            2. Equipment types that require the most attention
-            3. Cost implications and budget considerations
-            4. Recommendations for maintenance optimization
-            5. Potential risk factors and areas of concern
-            6. Suggestions for preventive maintenance strategies
-            
-            Format your response in a clear, structured manner suitable for energy grid management professionals.
-            """
+            analysis_prompt = self.build_maintenance_prompt(maintenance_records)
             
             # Use Claude AI for analysis
             if st.session_state.claude_client:
@@ -709,8 +1483,54 @@ class EnergyAgentTools:
         """Close the database connection."""
         if self.driver:
             self.driver.close()
+            # Only this driver is closed; get_driver's validate hook sees it fail
+            # connectivity and rebuilds just that cache entry on its next use
+            self.driver = None
             logger.info("Neo4j connection closed")
 
+def _tools_alive(tools: "EnergyAgentTools") -> bool:
+    """
+    Check shared database tools still hold a usable driver before reusing them.
+    
+    Args:
+        tools: EnergyAgentTools instance from get_energy_tools
+        
+    Returns:
+        True if the tools are connected, False to have the cache rebuild them
+    """
+    return tools.driver is not None and _driver_alive(tools.driver)
+
+@st.cache_resource(show_spinner=False, validate=_tools_alive)
+def get_energy_tools(uri: str, username: str, password: str, database: str) -> EnergyAgentTools:
+    """
+    Create the database tools once per connection and share them across sessions.
+    
+    Indexes are not created here; run setup_indexes.py once per database.
+    
+    Args:
+        uri: Neo4j database URI
+        username: Neo4j username
+        password: Neo4j password
+        database: Neo4j database name
+        
+    Returns:
+        Connected EnergyAgentTools instance
+    """
+    return EnergyAgentTools(uri, username, password, database)
+
+@st.cache_resource(show_spinner=False)
+def get_claude_client(api_key: str) -> ClaudeClient:
+    """
+    Create the Claude client once per API key and share it across sessions.
+    
+    Args:
+        api_key: Claude API key
+        
+    Returns:
+        ClaudeClient instance
+    """
+    return ClaudeClient(api_key=api_key)
+
 # Page configuration
 st.set_page_config(
     page_title="Energy Grid Management Agent",
@@ -729,21 +1549,28 @@ if 'claude_client' not in st.session_state:
 if 'connection_status' not in st.session_state:
     st.session_state.connection_status = "disconnected"
 
-if 'maintenance_records' not in st.session_state:
-    st.session_state.maintenance_records = []
+# Only the last query inputs are kept per session; results come from the query cache
+if 'last_search' not in st.session_state:
+    st.session_state.last_search = None
 
-if 'risky_equipment' not in st.session_state:
-    st.session_state.risky_equipment = []
+if 'last_risk_threshold' not in st.session_state:
+    st.session_state.last_risk_threshold = None
+
+if 'last_vibration_days' not in st.session_state:
+    st.session_state.last_vibration_days = None
+
+if 'vibration_csv_filename' not in st.session_state:
+    st.session_state.vibration_csv_filename = None
 
 def initialize_connection(uri: str, username: str, password: str, database: str, claude_key: str):
     """Initialize database and AI connections."""
     try:
         # Initialize EnergyAgentTools
-        st.session_state.energy_tools = EnergyAgentTools(uri, username, password, database)
+        st.session_state.energy_tools = get_energy_tools(uri, username, password, database)
         st.session_state.connection_status = "connected"
         
         # Initialize Claude client
-        st.session_state.claude_client = ClaudeClient(api_key=claude_key)
+        st.session_state.claude_client = get_claude_client(claude_key)
         
         st.success("✅ Connection established successfully!")
         return True
@@ -819,8 +1646,8 @@ def main():
         # Disconnect Button
         if st.session_state.connection_status == "connected":
             if st.button("🔌 Disconnect", use_container_width=True):
-                if st.session_state.energy_tools:
-                    st.session_state.energy_tools.close()
+                # Only detach this session; the shared instances stay open for other
+                # sessions and are revalidated on the next connect
                 st.session_state.energy_tools = None
                 st.session_state.claude_client = None
                 st.session_state.connection_status = "disconnected"
@@ -867,11 +1694,28 @@ def show_equipment_analysis():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        equipment_type = st.text_input(
-            "Equipment Type (Optional)",
-            placeholder="e.g., Generator, Transformer, Bus",
-            help="Filter by specific equipment type"
-        )
+        # Known types from the cached database lookup; free text if none are available
+        equipment_types = []
+        if st.session_state.energy_tools:
+            tools = st.session_state.energy_tools
+            try:
+                equipment_types = equipment_type_options(tools, tools.uri, tools.database)
+            except Exception as e:
+                # Failures are not cached, so the next rerun retries the lookup
+                logger.error(f"Equipment type lookup error: {e}")
+        if equipment_types:
+            equipment_type = st.selectbox(
+                "Equipment Type (Optional)",
+                options=[None] + equipment_types,
+                format_func=lambda option: "All equipment types" if option is None else option,
+                help="Filter by specific equipment type"
+            )
+        else:
+            equipment_type = st.text_input(
+                "Equipment Type (Optional)",
+                placeholder="e.g., Generator, Transformer, Bus",
+                help="Filter by specific equipment type"
+            )
     
     with col2:
         issue_type = st.text_input(
@@ -903,42 +1747,53 @@ def show_equipment_analysis():
         
         with st.spinner("Searching maintenance records..."):
             try:
-                results = st.session_state.energy_tools.search_equipment_maintenance_records(
-                    equipment_type=equipment_type if equipment_type.strip() else None,
-                    issue_type=issue_type if issue_type.strip() else None,
-                    days_back=days_back
-                )
+                # Normalized filters so identical searches share one cached frame
+                search_params = {
+                    "equipment_type": (equipment_type or "").strip() or None,
+                    "issue_type": issue_type.strip() or None,
+                    "days_back": int(days_back)
+                }
                 
-                st.session_state.maintenance_records = results
+                # Frame built once for metrics, charts and export
+                tools = st.session_state.energy_tools
+                df = search_results_frame(tools, tools.uri, tools.database, **search_params)
                 
-                if results:
-                    st.success(f"✅ Found {len(results)} maintenance records")
+                st.session_state.last_search = search_params if not df.empty else None
+                
+                if not df.empty:
+                    st.success(f"✅ Found {len(df)} maintenance records")
+                    
+                    # Summary metrics from a single aggregation call
+                    metric_aggs = {
+                        'equipment_type': ['nunique'],
+                        'maintenance_cost': ['sum'],
+                        'maintenance_date': ['min', 'max']
+                    }
+                    stats = df.agg({col: funcs for col, funcs in metric_aggs.items() if col in df.columns})
                     
                     # Display results count and summary
                     col1, col2, col3, col4 = st.columns(4)
                     
                     with col1:
-                        st.metric("Total Records", len(results))
+                        st.metric("Total Records", len(df))
                     
                     with col2:
-                        df = pd.DataFrame(results)
                         if 'equipment_type' in df.columns:
-                            unique_types = df['equipment_type'].nunique()
+                            unique_types = int(stats.at['nunique', 'equipment_type'])
                             st.metric("Equipment Types", unique_types)
                         else:
                             st.metric("Equipment Types", "N/A")
                     
                     with col3:
                         if 'maintenance_cost' in df.columns:
-                            total_cost = df['maintenance_cost'].sum()
+                            total_cost = stats.at['sum', 'maintenance_cost']
                             st.metric("Total Cost", f"${total_cost:,.2f}")
                         else:
                             st.metric("Total Cost", "N/A")
                     
                     with col4:
                         if 'maintenance_date' in df.columns:
-                            df['maintenance_date'] = pd.to_datetime(df['maintenance_date'])
-                            date_range = (df['maintenance_date'].max() - df['maintenance_date'].min()).days
+                            date_range = (stats.at['max', 'maintenance_date'] - stats.at['min', 'maintenance_date']).days
                             st.metric("Date Range", f"{date_range} days")
                         else:
                             st.metric("Date Range", "N/A")
@@ -946,141 +1801,103 @@ def show_equipment_analysis():
                     # Visualizations
                     st.subheader("📊 Maintenance Analysis Charts")
                     
+                    # Grouped counts come from the cached summary, not per-rerun groupbys
+                    summary = summarize_maintenance(df)
+                    
                     # Maintenance frequency chart
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        if 'equipment_type' in df.columns:
-                            type_counts = df['equipment_type'].value_counts()
-                            fig_frequency = px.bar(
-                                x=type_counts.index,
-                                y=type_counts.values,
-                                title="Maintenance Frequency by Equipment Type",
-                                labels={'x': 'Equipment Type', 'y': 'Maintenance Count'},
-                                color=type_counts.values,
-                                color_continuous_scale='viridis'
-                            )
-                            fig_frequency.update_layout(showlegend=False)
-                            st.plotly_chart(fig_frequency, use_container_width=True)
+                        type_counts = summary["type_counts"]
+                        if type_counts is not None:
+                            render_chart(create_count_bar_chart(
+                                type_counts,
+                                "Maintenance Frequency by Equipment Type",
+                                "Equipment Type",
+                                "Maintenance Count"
+                            ))
                     
                     # Timeline chart
                     with col2:
-                        if 'maintenance_date' in df.columns:
-                            # Group by month for timeline
-                            df['month'] = df['maintenance_date'].dt.to_period('M')
-                            monthly_counts = df.groupby('month').size().reset_index(name='count')
-                            monthly_counts['month'] = monthly_counts['month'].astype(str)
-                            
-                            fig_timeline = px.line(
-                                monthly_counts,
-                                x='month',
-                                y='count',
-                                title="Maintenance Activities Timeline",
-                                labels={'month': 'Month', 'count': 'Maintenance Count'},
-                                markers=True
-                            )
-                            fig_timeline.update_xaxes(tickangle=45)
-                            st.plotly_chart(fig_timeline, use_container_width=True)
+                        monthly_counts = summary["monthly_counts"]
+                        if monthly_counts is not None:
+                            render_chart(create_monthly_line_chart(monthly_counts))
                     
                     # Additional visualizations
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        if 'maintenance_type' in df.columns:
-                            maint_type_counts = df['maintenance_type'].value_counts()
-                            fig_maint_type = px.pie(
-                                values=maint_type_counts.values,
-                                names=maint_type_counts.index,
-                                title="Maintenance Type Distribution"
-                            )
-                            st.plotly_chart(fig_maint_type, use_container_width=True)
+                        maint_type_counts = summary["maint_type_counts"]
+                        if maint_type_counts is not None:
+                            render_chart(create_distribution_pie_chart(maint_type_counts, "Maintenance Type Distribution"))
                     
                     with col2:
                         if 'maintenance_cost' in df.columns:
                             # Cost distribution
-                            fig_cost_dist = px.histogram(
-                                df,
-                                x='maintenance_cost',
-                                title="Maintenance Cost Distribution",
-                                nbins=20,
-                                labels={'maintenance_cost': 'Cost ($)', 'count': 'Frequency'}
-                            )
-                            st.plotly_chart(fig_cost_dist, use_container_width=True)
+                            render_chart(create_histogram_chart(
+                                df['maintenance_cost'],
+                                "Maintenance Cost Distribution",
+                                "Cost ($)",
+                                "Frequency"
+                            ))
                     
                     # Data table in expandable section
                     with st.expander("📋 View Raw Data Table", expanded=False):
                         st.dataframe(df, use_container_width=True)
                         
                         # Download button
-                        csv = df.to_csv(index=False)
+                        csv = df_to_csv_bytes(df)
                         st.download_button(
                             label="📥 Download CSV",
                             data=csv,
-                            file_name=f"maintenance_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                            file_name=f"maintenance_records_{get_session_timestamp()}.csv",
                             mime="text/csv"
                         )
                     
                     # Claude AI Analysis section
-                    st.subheader("🤖 AI-Powered Analysis")
-                    
-                    if st.session_state.claude_client:
-                        if st.button("🧠 Analyze with Claude AI", type="secondary"):
-                            with st.spinner("Claude AI is analyzing maintenance patterns..."):
-                                try:
-                                    analysis = st.session_state.energy_tools.analyze_maintenance_patterns(results)
-                                    
-                                    st.success("✅ AI Analysis Complete!")
-                                    
-                                    # Display analysis in a nice format
-                                    st.markdown("### 📊 Maintenance Pattern Analysis")
-                                    st.markdown(analysis)
-                                    
-                                    # Store analysis in session state for potential export
-                                    st.session_state.last_analysis = {
-                                        "timestamp": datetime.now(),
-                                        "filters": {
-                                            "equipment_type": equipment_type,
-                                            "issue_type": issue_type,
-                                            "days_back": days_back
-                                        },
-                                        "analysis": analysis
-                                    }
-                                    
-                                except Exception as e:
-                                    st.error(f"❌ AI Analysis failed: {e}")
-                    else:
-                        st.warning("⚠️ Claude AI client not available. Please check your API key in the sidebar.")
+                    show_maintenance_analysis(search_params)
                     
                 else:
                     st.info("ℹ️ No maintenance records found matching your criteria.")
-                    st.session_state.maintenance_records = []
                     
             except Exception as e:
                 st.error(f"❌ Error searching maintenance records: {e}")
                 logger.error(f"Search error: {e}")
     
     # Display previous results if available
-    elif st.session_state.maintenance_records:
+    elif st.session_state.last_search and st.session_state.energy_tools:
         st.subheader("📊 Previous Search Results")
         
-        df = pd.DataFrame(st.session_state.maintenance_records)
-        
-        # Quick summary
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Total Records", len(st.session_state.maintenance_records))
-        with col2:
-            if 'maintenance_cost' in df.columns:
-                total_cost = df['maintenance_cost'].sum()
-                st.metric("Total Cost", f"${total_cost:,.2f}")
-        with col3:
-            if 'equipment_type' in df.columns:
-                unique_types = df['equipment_type'].nunique()
-                st.metric("Equipment Types", unique_types)
-        
-        # Show data table
-        with st.expander("📋 View Previous Results", expanded=False):
-            st.dataframe(df, use_container_width=True)
+        # Frame cached on the last search inputs; no record hashing or rebuild per rerun
+        tools = st.session_state.energy_tools
+        try:
+            df = search_results_frame(tools, tools.uri, tools.database, **st.session_state.last_search)
+        except Exception as e:
+            st.error(f"❌ Error loading previous search results: {e}")
+            logger.error(f"Previous search error: {e}")
+        else:
+            # Quick summary
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Records", len(df))
+            with col2:
+                if 'maintenance_cost' in df.columns:
+                    total_cost = df['maintenance_cost'].sum()
+                    st.metric("Total Cost", f"${total_cost:,.2f}")
+            with col3:
+                if 'equipment_type' in df.columns:
+                    unique_types = df['equipment_type'].nunique()
+                    st.metric("Equipment Types", unique_types)
+            
+            # Charts rerun on their own when the chart view changes
+            show_maintenance_chart_panel(df)
+            
+            # Show data table
+            with st.expander("📋 View Previous Results", expanded=False):
+                st.dataframe(df, use_container_width=True)
+            
+            # Claude AI Analysis section (the button click reruns into this branch)
+            show_maintenance_analysis(st.session_state.last_search)
     
     # Help section
     with st.expander("ℹ️ How to use Equipment Analysis", expanded=False):
@@ -1088,7 +1905,7 @@ def show_equipment_analysis():
         **Equipment Analysis Guide:**
         
         **Filters:**
-        - **Equipment Type**: Enter specific equipment types (e.g., "Generator", "Transformer")
+        - **Equipment Type**: Pick a specific equipment type (e.g., "Generator", "Transformer")
         - **Issue Type**: Search for specific issues (default: "vibration")
         - **Days Back**: Set the time period for analysis (1-730 days)
         
@@ -1105,8 +1922,9 @@ def show_equipment_analysis():
         - Use AI analysis for comprehensive pattern recognition
         """)
 
+@_fragment
 def show_risk_assessment():
-    """Show risk assessment interface."""
+    """Show risk assessment interface (slider changes rerun only this tab)."""
     st.header("⚠️ Risk Assessment")
     st.markdown("Identify and analyze high-risk equipment across the grid with comprehensive risk metrics and visualizations.")
     
@@ -1162,18 +1980,18 @@ def show_risk_assessment():
         
         with st.spinner("Analyzing equipment risk..."):
             try:
-                results = st.session_state.energy_tools.get_risky_equipment(risk_threshold)
-                st.session_state.risky_equipment = results
+                # Round away slider float noise so the threshold is a stable cache key
+                query_threshold = round(risk_threshold, 2)
+                tools = st.session_state.energy_tools
+                df = risk_results_frame(tools, tools.uri, tools.database, query_threshold)
+                st.session_state.last_risk_threshold = query_threshold if not df.empty else None
                 
-                if results:
-                    st.success(f"✅ Found {len(results)} high-risk equipment items")
-                    
-                    # Convert to DataFrame for analysis
-                    df = pd.DataFrame(results)
+                if not df.empty:
+                    st.success(f"✅ Found {len(df)} high-risk equipment items")
                     
                     # Calculate metrics
                     avg_risk = df['risk_score'].mean() if 'risk_score' in df.columns else 0
-                    critical_count = len(df[df['equipment_criticality'] == 'Critical']) if 'equipment_criticality' in df.columns else 0
+                    critical_count = int((df['equipment_criticality'] == 'Critical').sum()) if 'equipment_criticality' in df.columns else 0
                     highest_risk = df['risk_score'].max() if 'risk_score' in df.columns else 0
                     affected_locations = df['equipment_location'].nunique() if 'equipment_location' in df.columns else 0
                     
@@ -1215,152 +2033,82 @@ def show_risk_assessment():
                     st.subheader("📈 Risk Visualization")
                     
                     if 'equipment_type' in df.columns and 'risk_score' in df.columns:
-                        # Prepare data for scatter plot
-                        # Create criticality size mapping
-                        criticality_size_map = {
-                            'Critical': 20,
-                            'High': 15,
-                            'Medium': 10,
-                            'Low': 5
-                        }
-                        
-                        df['size'] = df['equipment_criticality'].map(criticality_size_map).fillna(10)
-                        
-                        # Create color scale based on risk score
-                        df['color'] = df['risk_score']
-                        
-                        # Create scatter plot
-                        fig_scatter = px.scatter(
-                            df,
-                            x='equipment_type',
-                            y='risk_score',
-                            color='color',
-                            size='size',
-                            hover_data=['equipment_name', 'equipment_location', 'risk_factors'],
-                            title="Equipment Risk Assessment Scatter Plot",
-                            labels={
-                                'equipment_type': 'Equipment Type',
-                                'risk_score': 'Risk Score',
-                                'color': 'Risk Level',
-                                'size': 'Criticality'
-                            },
-                            color_continuous_scale='reds',
-                            size_max=20
-                        )
-                        
-                        # Update layout for better visualization
-                        fig_scatter.update_layout(
-                            xaxis_title="Equipment Type",
-                            yaxis_title="Risk Score",
-                            height=500,
-                            showlegend=True
-                        )
-                        
-                        # Add threshold line
-                        fig_scatter.add_hline(
-                            y=risk_threshold,
-                            line_dash="dash",
-                            line_color="red",
-                            annotation_text=f"Threshold: {risk_threshold}",
-                            annotation_position="top right"
-                        )
-                        
-                        st.plotly_chart(fig_scatter, use_container_width=True)
+                        # Scatter plot sized by criticality with the threshold line; the rounded
+                        # threshold keeps the chart cache key in step with the frame cache
+                        render_chart(create_risk_chart(df, query_threshold))
                         
                         # Additional visualizations
                         col1, col2 = st.columns(2)
                         
                         with col1:
                             # Risk score distribution
-                            fig_dist = px.histogram(
-                                df,
-                                x='risk_score',
-                                title="Risk Score Distribution",
-                                nbins=20,
-                                color_discrete_sequence=['red'],
-                                labels={'risk_score': 'Risk Score', 'count': 'Equipment Count'}
-                            )
-                            fig_dist.add_vline(
-                                x=risk_threshold,
-                                line_dash="dash",
-                                line_color="red",
-                                annotation_text=f"Threshold: {risk_threshold}"
-                            )
-                            st.plotly_chart(fig_dist, use_container_width=True)
+                            render_chart(create_histogram_chart(
+                                df['risk_score'],
+                                "Risk Score Distribution",
+                                "Risk Score",
+                                "Equipment Count",
+                                color='red',
+                                threshold=risk_threshold
+                            ))
                         
                         with col2:
                             # Equipment type by risk
-                            if 'equipment_type' in df.columns:
-                                type_avg_risk = df.groupby('equipment_type')['risk_score'].mean().sort_values(ascending=False)
-                                fig_type = px.bar(
-                                    x=type_avg_risk.index,
-                                    y=type_avg_risk.values,
-                                    title="Average Risk Score by Equipment Type",
-                                    labels={'x': 'Equipment Type', 'y': 'Average Risk Score'},
-                                    color=type_avg_risk.values,
-                                    color_continuous_scale='reds'
-                                )
-                                fig_type.update_layout(showlegend=False)
-                                st.plotly_chart(fig_type, use_container_width=True)
+                            type_stats = category_stats(df['equipment_type'], df['risk_score'])
+                            type_avg_risk = type_stats['mean'].dropna().sort_values(ascending=False)
+                            render_chart(create_count_bar_chart(
+                                type_avg_risk,
+                                "Average Risk Score by Equipment Type",
+                                "Equipment Type",
+                                "Average Risk Score",
+                                colorscale='reds'
+                            ))
                     
                     # Expandable data table with color-coded risk scores
                     st.subheader("📋 Risk Assessment Details")
                     
                     with st.expander("🔍 View Detailed Risk Data", expanded=False):
-                        # Create a styled dataframe with color-coded risk scores
-                        display_df = df.copy()
-                        
-                        # Add color coding for risk scores
-                        def color_risk_score(val):
-                            if pd.isna(val):
-                                return ''
-                            if val >= 0.8:
-                                return 'background-color: #ff4444; color: white; font-weight: bold'
-                            elif val >= 0.6:
-                                return 'background-color: #ffaa00; color: black; font-weight: bold'
-                            elif val >= 0.4:
-                                return 'background-color: #ffff00; color: black'
-                            else:
-                                return 'background-color: #90EE90; color: black'
-                        
-                        # Apply styling
-                        styled_df = display_df.style.applymap(
-                            color_risk_score, 
+                        # Style the frame directly; the Styler never mutates it, so no copy is needed
+                        styled_df = df.style.apply(
+                            style_risk_scores,
                             subset=['risk_score']
                         ).format({
                             'risk_score': '{:.3f}',
-                            'maintenance_cost': '${:,.2f}' if 'maintenance_cost' in display_df.columns else None
+                            'maintenance_cost': '${:,.2f}' if 'maintenance_cost' in df.columns else None
                         })
                         
                         st.dataframe(styled_df, use_container_width=True)
                         
                         # Download button
-                        csv = df.to_csv(index=False)
+                        csv = df_to_csv_bytes(df)
                         st.download_button(
                             label="📥 Download Risk Assessment CSV",
                             data=csv,
-                            file_name=f"risk_assessment_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                            file_name=f"risk_assessment_{get_session_timestamp()}.csv",
                             mime="text/csv"
                         )
                     
                     # Risk insights section
                     st.subheader("💡 Risk Insights")
                     
+                    # Bucket risk scores in one pass: < 0.4, [0.4, 0.6), [0.6, 0.8), >= 0.8
+                    scores = df['risk_score'].dropna().to_numpy()
+                    risk_buckets = np.bincount(np.digitize(scores, [0.4, 0.6, 0.8]), minlength=4)
+                    
                     col1, col2 = st.columns(2)
                     
                     with col1:
                         st.info(f"""
                         **Risk Assessment Summary:**
                         
-                        📊 **Total High-Risk Equipment**: {len(results)}
+                        📊 **Total High-Risk Equipment**: {len(df)}
                         🎯 **Risk Threshold**: {risk_threshold}
                         📍 **Affected Locations**: {affected_locations}
                         ⚠️ **Critical Equipment**: {critical_count}
                         
                         **Risk Distribution:**
-                        - Very High Risk (≥0.8): {len(df[df['risk_score'] >= 0.8])}
-                        - High Risk (0.6-0.8): {len(df[(df['risk_score'] >= 0.6) & (df['risk_score'] < 0.8)])}
-                        - Medium Risk (0.4-0.6): {len(df[(df['risk_score'] >= 0.4) & (df['risk_score'] < 0.6)])}
+                        - Very High Risk (≥0.8): {risk_buckets[3]}
+                        - High Risk (0.6-0.8): {risk_buckets[2]}
+                        - Medium Risk (0.4-0.6): {risk_buckets[1]}
                         """)
                     
                     with col2:
@@ -1393,38 +2141,46 @@ def show_risk_assessment():
                     
                 else:
                     st.info(f"ℹ️ No equipment found with risk score >= {risk_threshold}")
-                    st.session_state.risky_equipment = []
                     
             except Exception as e:
                 st.error(f"❌ Error assessing risk: {e}")
                 logger.error(f"Risk assessment error: {e}")
     
     # Display previous results if available
-    elif st.session_state.risky_equipment:
+    elif st.session_state.last_risk_threshold is not None and st.session_state.energy_tools:
         st.subheader("📊 Previous Risk Assessment Results")
         
-        df = pd.DataFrame(st.session_state.risky_equipment)
-        
-        # Quick summary
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("High-Risk Equipment", len(st.session_state.risky_equipment))
-        with col2:
-            if 'risk_score' in df.columns:
-                avg_risk = df['risk_score'].mean()
-                st.metric("Average Risk Score", f"{avg_risk:.2f}")
-        with col3:
-            if 'equipment_criticality' in df.columns:
-                critical_count = len(df[df['equipment_criticality'] == 'Critical'])
-                st.metric("Critical Equipment", critical_count)
-        with col4:
-            if 'equipment_location' in df.columns:
-                locations = df['equipment_location'].nunique()
-                st.metric("Affected Locations", locations)
-        
-        # Show data table
-        with st.expander("📋 View Previous Risk Assessment", expanded=False):
-            st.dataframe(df, use_container_width=True)
+        # Frame cached on the last threshold; no record hashing or rebuild per rerun
+        tools = st.session_state.energy_tools
+        try:
+            df = risk_results_frame(tools, tools.uri, tools.database, st.session_state.last_risk_threshold)
+        except Exception as e:
+            st.error(f"❌ Error loading previous risk assessment: {e}")
+            logger.error(f"Previous risk assessment error: {e}")
+        else:
+            # Quick summary
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("High-Risk Equipment", len(df))
+            with col2:
+                if 'risk_score' in df.columns:
+                    avg_risk = df['risk_score'].mean()
+                    st.metric("Average Risk Score", f"{avg_risk:.2f}")
+            with col3:
+                if 'equipment_criticality' in df.columns:
+                    critical_count = int((df['equipment_criticality'] == 'Critical').sum())
+                    st.metric("Critical Equipment", critical_count)
+            with col4:
+                if 'equipment_location' in df.columns:
+                    locations = df['equipment_location'].nunique()
+                    st.metric("Affected Locations", locations)
+            
+            # Risk chart from the cached results, no new assessment query
+            show_risk_chart_panel(df)
+            
+            # Show data table
+            with st.expander("📋 View Previous Risk Assessment", expanded=False):
+                st.dataframe(df, use_container_width=True)
     
     # Help section
     with st.expander("ℹ️ How to use Risk Assessment", expanded=False):
@@ -1497,25 +2253,30 @@ def show_dependencies():
         
         with st.spinner("Analyzing equipment dependencies..."):
             try:
-                results = st.session_state.energy_tools.get_installation_equipments_dependency(
-                    installation_id if installation_id.strip() else None
-                )
+                # Normalized filter so identical analyses share one cached frame
+                tools = st.session_state.energy_tools
+                df = dependency_results_frame(tools, tools.uri, tools.database, installation_id.strip() or None)
                 
-                if results:
-                    st.success(f"✅ Found {len(results)} installation-equipment relationships")
-                    
-                    # Convert to DataFrame for analysis
-                    df = pd.DataFrame(results)
-                    
-                    # Calculate metrics
-                    installations_count = df['installation_id'].nunique() if 'installation_id' in df.columns else 0
-                    equipment_count = df['equipment_id'].nunique() if 'equipment_id' in df.columns else 0
-                    
-                    # Count dependencies
+                if not df.empty:
+                    st.success(f"✅ Found {len(df)} installation-equipment relationships")
+                    
+                    # Calculate metrics in a single aggregation call over the present columns
+                    metric_aggs = {
+                        'installation_id': 'nunique',
+                        'equipment_id': 'nunique',
+                        'current_risk_score': 'mean'
+                    }
+                    stats = df.agg({col: func for col, func in metric_aggs.items() if col in df.columns})
+                    installations_count = int(stats.get('installation_id', 0))
+                    equipment_count = int(stats.get('equipment_id', 0))
+                    
+                    # Count dependencies and per-equipment dependents in one pass
                     dependency_count = 0
+                    dependent_counter = Counter()
                     if 'dependent_equipment' in df.columns:
-                        for deps in df['dependent_equipment']:
-                            if deps and len(deps) > 0:
+                        for deps in df['dependent_equipment'].to_numpy():
+                            if deps:
+                                dependent_counter.update(deps)
                                 dependency_count += len(deps)
                     
                     # Display metrics
@@ -1546,7 +2307,7 @@ def show_dependencies():
                     
                     with col4:
                         if 'current_risk_score' in df.columns:
-                            avg_risk = df['current_risk_score'].mean()
+                            avg_risk = stats['current_risk_score']
                             st.metric(
                                 "Avg Risk Score",
                                 f"{avg_risk:.2f}",
@@ -1564,82 +2325,65 @@ def show_dependencies():
                         # Installation equipment distribution
                         if 'installation_id' in df.columns and 'equipment_id' in df.columns:
                             install_equipment_counts = df.groupby('installation_id').size().sort_values(ascending=False)
-                            
-                            fig_install = px.bar(
-                                x=install_equipment_counts.index,
-                                y=install_equipment_counts.values,
-                                title="Equipment Count by Installation",
-                                labels={'x': 'Installation ID', 'y': 'Equipment Count'},
-                                color=install_equipment_counts.values,
-                                color_continuous_scale='blues'
-                            )
-                            fig_install.update_layout(showlegend=False)
-                            st.plotly_chart(fig_install, use_container_width=True)
+                            render_chart(create_count_bar_chart(
+                                install_equipment_counts,
+                                "Equipment Count by Installation",
+                                "Installation ID",
+                                "Equipment Count",
+                                colorscale='blues'
+                            ))
                     
                     with col2:
                         # Equipment criticality distribution
                         if 'equipment_criticality' in df.columns:
                             criticality_counts = df['equipment_criticality'].value_counts()
-                            
-                            fig_criticality = px.pie(
-                                values=criticality_counts.values,
-                                names=criticality_counts.index,
-                                title="Equipment Criticality Distribution"
-                            )
-                            st.plotly_chart(fig_criticality, use_container_width=True)
+                            render_chart(create_distribution_pie_chart(criticality_counts, "Equipment Criticality Distribution"))
                     
                     # Dependency network analysis
                     if 'dependent_equipment' in df.columns:
                         st.subheader("🔗 Dependency Network")
                         
-                        # Count dependencies
-                        dependency_counts = []
-                        for deps in df['dependent_equipment']:
-                            if deps and len(deps) > 0:
-                                dependency_counts.extend(deps)
-                        
-                        if dependency_counts:
-                            dep_df = pd.DataFrame({'equipment_id': dependency_counts})
-                            dep_counts = dep_df['equipment_id'].value_counts().head(10)
-                            
-                            fig_dep = px.bar(
-                                x=dep_counts.index,
-                                y=dep_counts.values,
-                                title="Most Dependent Equipment",
-                                labels={'x': 'Equipment ID', 'y': 'Dependency Count'},
-                                color=dep_counts.values,
-                                color_continuous_scale='reds'
-                            )
-                            fig_dep.update_layout(showlegend=False)
-                            st.plotly_chart(fig_dep, use_container_width=True)
+                        # Top dependents from the counts gathered with the metrics
+                        if dependent_counter:
+                            dep_counts = pd.Series(dict(dependent_counter.most_common(10)))
+                            render_chart(create_count_bar_chart(
+                                dep_counts,
+                                "Most Dependent Equipment",
+                                "Equipment ID",
+                                "Dependency Count",
+                                colorscale='reds'
+                            ))
                     
                     # Data table with dependency relationships
                     st.subheader("📋 Dependency Relationships")
                     
                     with st.expander("🔍 View Detailed Dependency Data", expanded=False):
-                        # Create a more readable display
-                        display_df = df.copy()
+                        # Create a more readable display; only the formatted columns are new,
+                        # the rest of the frame is shared rather than copied
+                        formatted = {}
                         
-                        # Format dependent equipment for better display
-                        if 'dependent_equipment' in display_df.columns:
-                            display_df['dependent_equipment'] = display_df['dependent_equipment'].apply(
-                                lambda x: ', '.join(x) if x and len(x) > 0 else 'None'
-                            )
+                        # Format dependent equipment for better display (empty or missing lists show as None)
+                        if 'dependent_equipment' in df.columns:
+                            joined = df['dependent_equipment'].str.join(', ')
+                            formatted['dependent_equipment'] = joined.mask(joined.eq('')).fillna('None')
                         
                         # Format maintenance history
-                        if 'maintenance_history' in display_df.columns:
-                            display_df['maintenance_history'] = display_df['maintenance_history'].apply(
-                                lambda x: f"{len(x)} records" if x and len(x) > 0 else 'No records'
+                        if 'maintenance_history' in df.columns:
+                            history_lens = df['maintenance_history'].str.len().fillna(0).astype(int)
+                            formatted['maintenance_history'] = np.where(
+                                history_lens > 0,
+                                history_lens.astype(str) + ' records',
+                                'No records'
                             )
                         
-                        st.dataframe(display_df, use_container_width=True)
+                        st.dataframe(replace_columns(df, formatted), use_container_width=True)
                         
                         # Download button
-                        csv = df.to_csv(index=False)
+                        csv = df_to_csv_bytes(df)
                         st.download_button(
                             label="📥 Download Dependencies CSV",
                             data=csv,
-                            file_name=f"dependencies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                            file_name=f"dependencies_{get_session_timestamp()}.csv",
                             mime="text/csv"
                         )
                     
@@ -1743,24 +2487,42 @@ def show_maintenance_scheduling():
         
         with st.spinner("Generating AI-powered maintenance schedule..."):
             try:
-                # Get high-risk equipment for scheduling
-                risky_equipment = st.session_state.energy_tools.get_risky_equipment(risk_threshold)
+                # High-risk equipment from the frame the risk page caches
+                # (rounded so the threshold is a stable cache key)
+                tools = st.session_state.energy_tools
+                df = risk_results_frame(tools, tools.uri, tools.database, round(risk_threshold, 2))
                 
-                if risky_equipment:
-                    st.success(f"✅ Generated maintenance schedule for {len(risky_equipment)} equipment items")
+                if not df.empty:
+                    st.success(f"✅ Generated maintenance schedule for {len(df)} equipment items")
+                    
+                    # Start the Claude call first; only the API request goes to the pool,
+                    # so the dependency lookup below overlaps with it
+                    prompt = tools.build_maintenance_prompt(df.to_dict('records'))
+                    schedule_future = get_analysis_executor().submit(
+                        st.session_state.claude_client.analyze_grid_data, prompt
+                    )
                     
-                    # Convert to DataFrame
-                    df = pd.DataFrame(risky_equipment)
+                    # Same cached frame the dependency page builds
+                    dep_df = dependency_results_frame(tools, tools.uri, tools.database, None)
                     
-                    # Generate AI-powered schedule
-                    schedule_analysis = st.session_state.energy_tools.analyze_maintenance_patterns(risky_equipment)
+                    # Generate AI-powered schedule; the client reports API errors in its
+                    # return value, so check it rather than relying on result() to raise
+                    schedule_error = None
+                    try:
+                        schedule_analysis = raise_on_failed_analysis(schedule_future.result())
+                    except Exception as e:
+                        logger.error(f"Failed to generate maintenance schedule: {e}")
+                        schedule_error = str(e)
                     
                     # Display AI-generated schedule
                     st.subheader("🤖 AI-Generated Maintenance Schedule")
                     
                     # Format the schedule display
                     st.markdown("### 📋 Schedule Overview")
-                    st.markdown(schedule_analysis)
+                    if schedule_error is not None:
+                        st.error(f"❌ AI schedule generation failed: {schedule_error}")
+                    else:
+                        st.markdown(schedule_analysis)
                     
                     # Schedule metrics
                     st.subheader("📊 Schedule Metrics")
@@ -1768,7 +2530,7 @@ def show_maintenance_scheduling():
                     col1, col2, col3, col4 = st.columns(4)
                     
                     with col1:
-                        st.metric("Scheduled Equipment", len(risky_equipment))
+                        st.metric("Scheduled Equipment", len(df))
                     
                     with col2:
                         if 'risk_score' in df.columns:
@@ -1777,7 +2539,7 @@ def show_maintenance_scheduling():
                     
                     with col3:
                         if 'equipment_criticality' in df.columns:
-                            critical_count = len(df[df['equipment_criticality'] == 'Critical'])
+                            critical_count = int((df['equipment_criticality'] == 'Critical').sum())
                             st.metric("Critical Equipment", critical_count)
                     
                     with col4:
@@ -1791,21 +2553,19 @@ def show_maintenance_scheduling():
                     with col1:
                         with st.expander("📊 Risk Data Summary", expanded=False):
                             if 'risk_score' in df.columns:
-                                risk_summary = df[['equipment_id', 'equipment_type', 'risk_score', 'equipment_criticality']].copy()
-                                risk_summary = risk_summary.sort_values('risk_score', ascending=False)
-                                st.dataframe(risk_summary, use_container_width=True)
+                                # Display only: the sort already returns a new frame, so no copy first
+                                risk_summary = df[['equipment_id', 'equipment_type', 'risk_score', 'equipment_criticality']]
+                                st.dataframe(risk_summary.sort_values('risk_score', ascending=False), use_container_width=True)
                             else:
                                 st.info("No risk data available")
                     
                     with col2:
                         with st.expander("🔗 Dependency Data Summary", expanded=False):
                             # Get dependency data for scheduled equipment
-                            equipment_ids = df['equipment_id'].tolist() if 'equipment_id' in df.columns else []
-                            if equipment_ids:
-                                dependency_data = st.session_state.energy_tools.get_installation_equipments_dependency()
-                                if dependency_data:
-                                    dep_df = pd.DataFrame(dependency_data)
-                                    scheduled_deps = dep_df[dep_df['equipment_id'].isin(equipment_ids)]
+                            if 'equipment_id' in df.columns and df['equipment_id'].notna().any():
+                                if not dep_df.empty:
+                                    # Inner join on the scheduled ids (deduplicated so no row is repeated)
+                                    scheduled_deps = dep_df.merge(df[['equipment_id']].drop_duplicates(), on='equipment_id')
                                     if not scheduled_deps.empty:
                                         st.dataframe(scheduled_deps[['equipment_id', 'dependent_equipment', 'current_risk_score']], use_container_width=True)
                                     else:
@@ -1824,39 +2584,29 @@ def show_maintenance_scheduling():
                         # Equipment type distribution in schedule
                         if 'equipment_type' in df.columns:
                             type_counts = df['equipment_type'].value_counts()
-                            fig_type = px.pie(
-                                values=type_counts.values,
-                                names=type_counts.index,
-                                title="Scheduled Equipment by Type"
-                            )
-                            st.plotly_chart(fig_type, use_container_width=True)
+                            render_chart(create_distribution_pie_chart(type_counts, "Scheduled Equipment by Type"))
                     
                     with col2:
                         # Risk score distribution
                         if 'risk_score' in df.columns:
-                            fig_risk = px.histogram(
-                                df,
-                                x='risk_score',
-                                title="Risk Score Distribution in Schedule",
-                                nbins=15,
-                                color_discrete_sequence=['orange']
-                            )
-                            fig_risk.add_vline(
-                                x=risk_threshold,
-                                line_dash="dash",
-                                line_color="red",
-                                annotation_text=f"Threshold: {risk_threshold}"
-                            )
-                            st.plotly_chart(fig_risk, use_container_width=True)
+                            render_chart(create_histogram_chart(
+                                df['risk_score'],
+                                "Risk Score Distribution in Schedule",
+                                "Risk Score",
+                                "Equipment Count",
+                                color='orange',
+                                threshold=risk_threshold,
+                                nbins=15
+                            ))
                     
                     # Download schedule
                     st.subheader("📥 Export Schedule")
                     
-                    csv = df.to_csv(index=False)
+                    csv = df_to_csv_bytes(df)
                     st.download_button(
                         label="📥 Download Maintenance Schedule CSV",
                         data=csv,
-                        file_name=f"maintenance_schedule_{schedule_start}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        file_name=f"maintenance_schedule_{schedule_start}_{get_session_timestamp()}.csv",
                         mime="text/csv"
                     )
                 
@@ -1867,6 +2617,128 @@ def show_maintenance_scheduling():
                 st.error(f"❌ Error generating maintenance schedule: {e}")
                 logger.error(f"Schedule generation error: {e}")
 
+# Vibration insight panels; only the summary has per-analysis values
+VIBRATION_SUMMARY_TEMPLATE = """
+**Vibration Analysis Summary:**
+
+📊 **Total Issues**: {issues}
+⚙️ **Affected Equipment**: {affected_equipment}
+🏭 **Equipment Types**: {equipment_types}
+💰 **Total Cost**: ${total_cost:,.2f}
+📅 **Analysis Period**: {days_back} days
+
+**Key Patterns:**
+- Most affected equipment types
+- Cost trends over time
+- Criticality distribution
+- Maintenance frequency patterns
+"""
+
+VIBRATION_MANAGEMENT_TEXT = """
+**Vibration Management:**
+
+**Common Causes:**
+- Bearing wear and lubrication issues
+- Misalignment and balancing problems
+- Resonance and harmonic vibrations
+- Foundation and mounting issues
+
+**Prevention Strategies:**
+- Regular vibration monitoring
+- Predictive maintenance scheduling
+- Equipment balancing and alignment
+- Foundation inspections
+"""
+
+VIBRATION_HELP_TEXT = """
+**Vibration Analysis Guide:**
+
+**Analysis Period:**
+- **7-30 days**: Recent vibration issues
+- **30-90 days**: Medium-term patterns
+- **90+ days**: Long-term trends
+
+**Key Metrics:**
+- **Affected Equipment**: Number of unique equipment with vibration issues
+- **Average Cost**: Mean cost per vibration incident
+- **Equipment Types**: Variety of equipment affected
+- **Total Cost**: Overall financial impact
+
+**Visualization Features:**
+- **Timeline Chart**: Vibration issues over time
+- **Equipment Distribution**: Issues by equipment type
+- **Cost Analysis**: Financial impact distribution
+- **Criticality Analysis**: Issues by equipment importance
+
+**AI Analysis:**
+- Pattern recognition in vibration failures
+- Root cause analysis
+- Preventive maintenance recommendations
+- Industry best practices
+
+**Best Practices:**
+- Regular vibration monitoring
+- Predictive maintenance scheduling
+- Equipment balancing and alignment
+- Foundation and mounting inspections
+"""
+
+def show_vibration_raw_data(df: pd.DataFrame, file_name: str) -> None:
+    """
+    Render the raw vibration table and CSV download once the user asks for them.
+    
+    The checkbox keeps its state across reruns, so nothing is formatted or
+    encoded for users who never open the raw data.
+    
+    Args:
+        df: Vibration records frame from vibration_analysis
+        file_name: CSV file name, fixed when the analysis was run
+    """
+    st.subheader("📋 Vibration Analysis Data")
+    
+    if not st.checkbox("🔍 View Raw Vibration Data", key="show_vibration_raw"):
+        return
+    
+    # Cap the rows sent to the browser before formatting anything
+    shown_df = df.head(MAX_DISPLAY_ROWS)
+    
+    # Only the formatted columns are new; the rest of the frame is shared, not copied
+    formatted = {}
+    
+    # Format dates for better display
+    if 'maintenance_date' in shown_df.columns:
+        dates = shown_df['maintenance_date']
+        if pa is not None:
+            # An Arrow date32 column displays as YYYY-MM-DD and goes into Streamlit's
+            # Arrow payload as-is, with no strings built or converted
+            formatted['maintenance_date'] = dates.astype(pd.ArrowDtype(pa.date32()))
+        else:
+            # Already datetime64 from vibration_analysis; a day-precision cast
+            # formats ISO dates in numpy without per-element strftime
+            formatted['maintenance_date'] = pd.Series(
+                dates.to_numpy('datetime64[D]').astype(str), index=dates.index
+            ).where(dates.notna())
+    
+    # Format costs in the browser; the column stays numeric so it sorts by value
+    st.dataframe(
+        replace_columns(shown_df, formatted),
+        use_container_width=True,
+        column_config={
+            'maintenance_cost': st.column_config.NumberColumn("maintenance_cost", format="$%.2f")
+        }
+    )
+    if len(df) > MAX_DISPLAY_ROWS:
+        st.caption(f"Showing {MAX_DISPLAY_ROWS:,} of {len(df):,} rows; the CSV download includes all rows.")
+    
+    # Download button
+    csv = df_to_csv_bytes(df)
+    st.download_button(
+        label="📥 Download Vibration Analysis CSV",
+        data=csv,
+        file_name=file_name,
+        mime="text/csv"
+    )
+
 def show_vibration_analysis():
     """Show vibration analysis interface."""
     st.header("🌊 Vibration Analysis")
@@ -1915,19 +2787,30 @@ def show_vibration_analysis():
         
         with st.spinner("Analyzing vibration-related issues..."):
             try:
-                results = st.session_state.energy_tools.get_vibration_analysis(days_back=days_back)
+                # Typed once per cache window; the page receives a ready-to-plot frame
+                tools = st.session_state.energy_tools
+                results, summary = vibration_analysis(tools, tools.uri, tools.database, days_back)
+                # Remember the period so later reruns (e.g. opening the raw data) keep the results,
+                # and stamp the export name once per run rather than on every rerun
+                st.session_state.last_vibration_days = days_back if not results.empty else None
+                if not results.empty:
+                    st.session_state.vibration_csv_filename = (
+                        f"vibration_analysis_{days_back}days_{get_session_timestamp()}.csv"
+                    )
                 
-                if results:
+                if not results.empty:
                     st.success(f"✅ Found {len(results)} vibration-related maintenance records")
                     
-                    # Convert to DataFrame for analysis
-                    df = pd.DataFrame(results)
+                    # Results already arrive as a DataFrame
+                    df = results
                     
-                    # Calculate metrics
-                    affected_equipment = df['equipment_id'].nunique() if 'equipment_id' in df.columns else 0
-                    avg_cost = df['maintenance_cost'].mean() if 'maintenance_cost' in df.columns else 0
-                    equipment_types = df['equipment_type'].nunique() if 'equipment_type' in df.columns else 0
-                    total_cost = df['maintenance_cost'].sum() if 'maintenance_cost' in df.columns else 0
+                    # Metrics, counts and cost stats come precomputed with the frame and are
+                    # shared by the metrics, the charts and the AI prompt
+                    type_counts = summary["type_counts"]
+                    affected_equipment = summary["affected_equipment"]
+                    avg_cost = summary["avg_cost"]
+                    equipment_types = summary["equipment_types"]
+                    total_cost = summary["total_cost"]
                     
                     # Display metrics
                     st.subheader("📊 Vibration Analysis Metrics")
@@ -1970,29 +2853,17 @@ def show_vibration_analysis():
                     with col1:
                         # Vibration issues over time
                         if 'maintenance_date' in df.columns:
-                            df['maintenance_date'] = pd.to_datetime(df['maintenance_date'])
-                            monthly_counts = df.groupby(df['maintenance_date'].dt.to_period('M')).size()
-                            
-                            fig_timeline = px.line(
-                                x=monthly_counts.index.astype(str),
-                                y=monthly_counts.values,
+                            # Month-start resample on the datetime index, plotted on a date axis
+                            render_chart(create_monthly_line_chart(
+                                summary["monthly_counts"],
                                 title="Vibration Issues Over Time",
-                                labels={'x': 'Month', 'y': 'Issue Count'},
-                                markers=True
-                            )
-                            fig_timeline.update_xaxes(tickangle=45)
-                            st.plotly_chart(fig_timeline, use_container_width=True)
+                                y_title="Issue Count"
+                            ))
                     
                     with col2:
                         # Equipment type distribution
-                        if 'equipment_type' in df.columns:
-                            type_counts = df['equipment_type'].value_counts()
-                            fig_type = px.pie(
-                                values=type_counts.values,
-                                names=type_counts.index,
-                                title="Vibration Issues by Equipment Type"
-                            )
-                            st.plotly_chart(fig_type, use_container_width=True)
+                        if type_counts is not None:
+                            render_chart(create_distribution_pie_chart(type_counts, "Vibration Issues by Equipment Type"))
                     
                     # Additional visualizations
                     col1, col2 = st.columns(2)
@@ -2000,30 +2871,26 @@ def show_vibration_analysis():
                     with col1:
                         # Cost distribution
                         if 'maintenance_cost' in df.columns:
-                            fig_cost = px.histogram(
-                                df,
-                                x='maintenance_cost',
-                                title="Vibration Issue Cost Distribution",
-                                nbins=15,
-                                color_discrete_sequence=['red'],
-                                labels={'maintenance_cost': 'Cost ($)', 'count': 'Issue Count'}
-                            )
-                            st.plotly_chart(fig_cost, use_container_width=True)
+                            render_chart(create_histogram_chart(
+                                df['maintenance_cost'],
+                                "Vibration Issue Cost Distribution",
+                                "Cost ($)",
+                                "Issue Count",
+                                color='red',
+                                nbins=15
+                            ))
                     
                     with col2:
                         # Criticality analysis
                         if 'equipment_criticality' in df.columns:
                             criticality_counts = df['equipment_criticality'].value_counts()
-                            fig_criticality = px.bar(
-                                x=criticality_counts.index,
-                                y=criticality_counts.values,
-                                title="Vibration Issues by Criticality",
-                                labels={'x': 'Criticality Level', 'y': 'Issue Count'},
-                                color=criticality_counts.values,
-                                color_continuous_scale='reds'
-                            )
-                            fig_criticality.update_layout(showlegend=False)
-                            st.plotly_chart(fig_criticality, use_container_width=True)
+                            render_chart(create_count_bar_chart(
+                                criticality_counts,
+                                "Vibration Issues by Criticality",
+                                "Criticality Level",
+                                "Issue Count",
+                                colorscale='reds'
+                            ))
                     
                     # Claude's specialized vibration analysis
                     st.subheader("🤖 AI-Powered Vibration Analysis")
@@ -2045,12 +2912,12 @@ def show_vibration_analysis():
                                     - Analysis Period: {days_back} days
                                     
                                     Equipment Type Distribution:
-                                    {df['equipment_type'].value_counts().to_dict() if 'equipment_type' in df.columns else {}}
+                                    {type_counts.to_dict() if type_counts is not None else {}}
                                     
                                     Cost Analysis:
                                     - Average Cost: ${avg_cost:,.2f}
-                                    - Maximum Cost: ${df['maintenance_cost'].max() if 'maintenance_cost' in df.columns else 0:,.2f}
-                                    - Minimum Cost: ${df['maintenance_cost'].min() if 'maintenance_cost' in df.columns else 0:,.2f}
+                                    - Maximum Cost: ${summary['max_cost']:,.2f}
+                                    - Minimum Cost: ${summary['min_cost']:,.2f}
                                     
                                     Please provide a specialized vibration analysis including:
                                     1. Common vibration failure patterns and root causes
@@ -2077,31 +2944,8 @@ def show_vibration_analysis():
                     else:
                         st.warning("⚠️ Claude AI client not available. Please check your API key in the sidebar.")
                     
-                    # Raw data table in expandable section
-                    st.subheader("📋 Vibration Analysis Data")
-                    
-                    with st.expander("🔍 View Raw Vibration Data", expanded=False):
-                        # Create a styled dataframe
-                        display_df = df.copy()
-                        
-                        # Format dates for better display
-                        if 'maintenance_date' in display_df.columns:
-                            display_df['maintenance_date'] = pd.to_datetime(display_df['maintenance_date']).dt.strftime('%Y-%m-%d')
-                        
-                        # Format costs
-                        if 'maintenance_cost' in display_df.columns:
-                            display_df['maintenance_cost'] = display_df['maintenance_cost'].apply(lambda x: f"${x:,.2f}")
-                        
-                        st.dataframe(display_df, use_container_width=True)
-                        
-                        # Download button
-                        csv = df.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Download Vibration Analysis CSV",
-                            data=csv,
-                            file_name=f"vibration_analysis_{days_back}days_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv"
-                        )
+                    # Raw data table, built only once requested
+                    show_vibration_raw_data(df, st.session_state.vibration_csv_filename)
                     
                     # Vibration insights
                     st.subheader("💡 Vibration Insights")
@@ -2109,38 +2953,16 @@ def show_vibration_analysis():
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        st.info(f"""
-                        **Vibration Analysis Summary:**
-                        
-                        📊 **Total Issues**: {len(results)}
-                        ⚙️ **Affected Equipment**: {affected_equipment}
-                        🏭 **Equipment Types**: {equipment_types}
-                        💰 **Total Cost**: ${total_cost:,.2f}
-                        📅 **Analysis Period**: {days_back} days
-                        
-                        **Key Patterns:**
-                        - Most affected equipment types
-                        - Cost trends over time
-                        - Criticality distribution
-                        - Maintenance frequency patterns
-                        """)
+                        st.info(VIBRATION_SUMMARY_TEMPLATE.format(
+                            issues=len(results),
+                            affected_equipment=affected_equipment,
+                            equipment_types=equipment_types,
+                            total_cost=total_cost,
+                            days_back=days_back
+                        ))
                     
                     with col2:
-                        st.warning("""
-                        **Vibration Management:**
-                        
-                        **Common Causes:**
-                        - Bearing wear and lubrication issues
-                        - Misalignment and balancing problems
-                        - Resonance and harmonic vibrations
-                        - Foundation and mounting issues
-                        
-                        **Prevention Strategies:**
-                        - Regular vibration monitoring
-                        - Predictive maintenance scheduling
-                        - Equipment balancing and alignment
-                        - Foundation inspections
-                        """)
+                        st.warning(VIBRATION_MANAGEMENT_TEXT)
                 
                 else:
                     st.info(f"ℹ️ No vibration-related maintenance records found for the last {days_back} days.")
@@ -2149,40 +2971,38 @@ def show_vibration_analysis():
                 st.error(f"❌ Error analyzing vibration issues: {e}")
                 logger.error(f"Vibration analysis error: {e}")
     
+    # Display previous results if available
+    elif st.session_state.last_vibration_days is not None and st.session_state.energy_tools:
+        st.subheader("📊 Previous Vibration Analysis Results")
+        
+        # Frame and summary cached on the last analysis period; no query or aggregation per rerun
+        tools = st.session_state.energy_tools
+        try:
+            df, summary = vibration_analysis(tools, tools.uri, tools.database, st.session_state.last_vibration_days)
+        except Exception as e:
+            st.error(f"❌ Error loading previous vibration analysis: {e}")
+            logger.error(f"Previous vibration analysis error: {e}")
+        else:
+            if df.empty:
+                # The cached records expired and the re-run query came back empty
+                st.info("ℹ️ No vibration-related maintenance records found for the last analysis period.")
+            else:
+                # Quick summary
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Vibration Issues", summary["issue_count"])
+                with col2:
+                    if 'maintenance_cost' in df.columns:
+                        st.metric("Total Cost", f"${summary['total_cost']:,.2f}")
+                with col3:
+                    if 'equipment_type' in df.columns:
+                        st.metric("Equipment Types", summary["equipment_types"])
+                
+                show_vibration_raw_data(df, st.session_state.vibration_csv_filename)
+    
     # Help section
     with st.expander("ℹ️ How to use Vibration Analysis", expanded=False):
-        st.markdown("""
-        **Vibration Analysis Guide:**
-        
-        **Analysis Period:**
-        - **7-30 days**: Recent vibration issues
-        - **30-90 days**: Medium-term patterns
-        - **90+ days**: Long-term trends
-        
-        **Key Metrics:**
-        - **Affected Equipment**: Number of unique equipment with vibration issues
-        - **Average Cost**: Mean cost per vibration incident
-        - **Equipment Types**: Variety of equipment affected
-        - **Total Cost**: Overall financial impact
-        
-        **Visualization Features:**
-        - **Timeline Chart**: Vibration issues over time
-        - **Equipment Distribution**: Issues by equipment type
-        - **Cost Analysis**: Financial impact distribution
-        - **Criticality Analysis**: Issues by equipment importance
-        
-        **AI Analysis:**
-        - Pattern recognition in vibration failures
-        - Root cause analysis
-        - Preventive maintenance recommendations
-        - Industry best practices
-        
-        **Best Practices:**
-        - Regular vibration monitoring
-        - Predictive maintenance scheduling
-        - Equipment balancing and alignment
-        - Foundation and mounting inspections
-        """)
+        st.markdown(VIBRATION_HELP_TEXT)
 
 if __name__ == "__main__":
     try:
@@ -11,10 +11,15 @@ from datetime import datetime, timedelta
 import json
 import logging
 import time
-from typing import List, Dict, Any, Optional
-from neo4j import GraphDatabase
+from typing import Dict, Any, Optional, Tuple
+from neo4j import GraphDatabase, RoutingControl
 from neo4j.exceptions import ServiceUnavailable, AuthError, ClientError
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to pandas JSON export
+    orjson = None
+
 # Import our cloud-optimized modules
 from secrets_manager import initialize_secrets, display_secrets_status
 from health_checker import initialize_health_checker
@@ -42,7 +47,7 @@ st.set_page_config(
 )
 
 # Custom CSS for cloud-optimized styling
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         background: linear-gradient(90deg, #1f77b4, #ff7f0e);
@@ -84,7 +89,22 @@ st.markdown("""
         background-color: #1f77b4;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+# Shared Plotly styling, built once at import rather than in every chart call
+CHART_LAYOUT = dict(
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    margin=dict(l=60, r=60, t=80, b=80),
+    height=500,
+    hovermode='closest'
+)
+CHART_TITLE_FONT = dict(size=18, color='#2c3e50')
+CHART_AXIS_STYLE = dict(
+    titlefont=dict(size=14, color='#34495e'),
+    tickfont=dict(size=12)
+)
 
 def initialize_session_state():
     """Initialize session state variables for cloud environment."""
@@ -98,6 +118,7 @@ def initialize_session_state():
         st.session_state.error_count = 0
         st.session_state.start_time = time.time()
         st.session_state.cloud_logger = None
+        st.session_state.maintenance_search = None
 
 def error_boundary(func):
     """Decorator for graceful error handling in cloud environment."""
@@ -129,29 +150,24 @@ def error_boundary(func):
     return wrapper
 
 @streamlit_cache_data(ttl=600)  # Cache for 10 minutes
-def create_maintenance_chart(maintenance_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
-    """Create a bar chart of maintenance by equipment type with cloud caching."""
-    if not maintenance_data:
+def create_maintenance_chart(type_counts: pd.DataFrame) -> Optional[go.Figure]:
+    """Create a bar chart of maintenance by equipment type from per-type counts with cloud caching."""
+    if type_counts is None or type_counts.empty:
         return None
     
     try:
-        df = pd.DataFrame(maintenance_data)
-        
-        if 'equipment_type' not in df.columns:
+        if 'equipment_type' not in type_counts.columns or 'maintenance_count' not in type_counts.columns:
             return None
         
-        type_counts = df['equipment_type'].value_counts()
-        
-        if type_counts.empty:
-            return None
+        counts = type_counts['maintenance_count'].to_numpy()
         
         fig = go.Figure()
         
         fig.add_trace(go.Bar(
-            x=type_counts.index,
-            y=type_counts.values,
+            x=type_counts['equipment_type'].to_numpy(),
+            y=counts,
             marker=dict(
-                color=type_counts.values,
+                color=counts,
                 colorscale='viridis',
                 showscale=True,
                 colorbar=dict(title="Maintenance Count")
@@ -168,25 +184,12 @@ def create_maintenance_chart(maintenance_data: List[Dict[str, Any]]) -> Optional
             title=dict(
                 text="Maintenance Frequency by Equipment Type",
                 x=0.5,
-                font=dict(size=18, color='#2c3e50')
-            ),
-            xaxis=dict(
-                title="Equipment Type",
-                titlefont=dict(size=14, color='#34495e'),
-                tickfont=dict(size=12),
-                tickangle=45
-            ),
-            yaxis=dict(
-                title="Maintenance Count",
-                titlefont=dict(size=14, color='#34495e'),
-                tickfont=dict(size=12)
+                font=CHART_TITLE_FONT
             ),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=60, r=60, t=80, b=80),
-            height=500,
+            xaxis=dict(title="Equipment Type", tickangle=45, **CHART_AXIS_STYLE),
+            yaxis=dict(title="Maintenance Count", **CHART_AXIS_STYLE),
             showlegend=False,
-            hovermode='closest'
+            **CHART_LAYOUT
         )
         
         return fig
@@ -196,13 +199,13 @@ def create_maintenance_chart(maintenance_data: List[Dict[str, Any]]) -> Optional
         return None
 
 @streamlit_cache_data(ttl=600)
-def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
+def create_risk_chart(risk_data: pd.DataFrame) -> Optional[go.Figure]:
     """Create a scatter plot of risk scores vs equipment types with cloud caching."""
-    if not risk_data:
+    if risk_data is None or risk_data.empty:
         return None
     
     try:
-        df = pd.DataFrame(risk_data)
+        df = risk_data
         
         if 'equipment_type' not in df.columns or 'risk_score' not in df.columns:
             return None
@@ -212,73 +215,49 @@ def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
         if df.empty:
             return None
         
-        criticality_size_map = {
-            'Critical': 20,
-            'High': 15,
-            'Medium': 10,
-            'Low': 5
-        }
-        
-        df['size'] = df.get('equipment_criticality', 'Medium').map(criticality_size_map).fillna(10)
+        criticality = df['equipment_criticality'] if 'equipment_criticality' in df.columns else pd.Series('Medium', index=df.index)
+        # Gather marker sizes by category code; unknown or missing labels (code -1)
+        # land on the LUT's trailing default
+        codes = pd.Categorical(criticality, categories=RISK_CRITICALITY_LABELS).codes
+        sizes = RISK_CRITICALITY_SIZES[codes]
+        names = df['equipment_name'] if 'equipment_name' in df.columns else pd.Series('', index=df.index)
         
         fig = go.Figure()
         
-        for eq_type in df['equipment_type'].unique():
-            type_data = df[df['equipment_type'] == eq_type]
-            
-            fig.add_trace(go.Scatter(
-                x=[eq_type] * len(type_data),
-                y=type_data['risk_score'],
-                mode='markers',
-                marker=dict(
-                    size=type_data['size'],
-                    color=type_data['risk_score'],
-                    colorscale='reds',
-                    showscale=True,
-                    colorbar=dict(title="Risk Score")
-                ),
-                text=type_data.get('equipment_name', ''),
-                hovertemplate=(
-                    "<b>Equipment:</b> %{text}<br>" +
-                    "<b>Type:</b> " + eq_type + "<br>" +
-                    "<b>Risk Score:</b> %{y:.3f}<br>" +
-                    "<b>Criticality:</b> " + type_data.get('equipment_criticality', 'Unknown').iloc[0] + "<br>" +
-                    "<extra></extra>"
-                ),
-                name=eq_type,
-                showlegend=True
-            ))
+        # One WebGL trace for every equipment type; per-point hover fields ride in customdata
+        fig.add_trace(go.Scattergl(
+            x=df['equipment_type'].to_numpy(),
+            y=df['risk_score'].to_numpy(),
+            mode='markers',
+            marker=dict(
+                size=sizes,
+                color=df['risk_score'].to_numpy(),
+                colorscale='reds',
+                showscale=True,
+                colorbar=dict(title="Risk Score")
+            ),
+            text=names.to_numpy(),
+            customdata=np.stack([df['equipment_type'].to_numpy(), criticality.astype(object).fillna('Unknown').to_numpy()], axis=1),
+            hovertemplate=(
+                "<b>Equipment:</b> %{text}<br>" +
+                "<b>Type:</b> %{customdata[0]}<br>" +
+                "<b>Risk Score:</b> %{y:.3f}<br>" +
+                "<b>Criticality:</b> %{customdata[1]}<br>" +
+                "<extra></extra>"
+            ),
+            name="Risk Score",
+            showlegend=False
+        ))
         
         fig.update_layout(
             title=dict(
                 text="Equipment Risk Assessment by Type",
                 x=0.5,
-                font=dict(size=18, color='#2c3e50')
-            ),
-            xaxis=dict(
-                title="Equipment Type",
-                titlefont=dict(size=14, color='#34495e'),
-                tickfont=dict(size=12),
-                tickangle=45
-            ),
-            yaxis=dict(
-                title="Risk Score",
-                titlefont=dict(size=14, color='#34495e'),
-                tickfont=dict(size=12),
-                range=[0, 1]
+                font=CHART_TITLE_FONT
             ),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=60, r=60, t=80, b=80),
-            height=500,
-            hovermode='closest',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            )
+            xaxis=dict(title="Equipment Type", tickangle=45, **CHART_AXIS_STYLE),
+            yaxis=dict(title="Risk Score", range=[0, 1], **CHART_AXIS_STYLE),
+            **CHART_LAYOUT
         )
         
         return fig
@@ -287,6 +266,70 @@ def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
         logger.error(f"Error creating risk chart: {e}")
         return None
 
+@streamlit_cache_data(ttl=300)  # Cache for 5 minutes
+def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Encode a results frame as CSV bytes once per distinct result."""
+    return df.to_csv(index=False).encode('utf-8')
+
+def _json_default(value: Any) -> str:
+    """Encode values orjson has no native type for, such as pandas and Neo4j timestamps."""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+@streamlit_cache_data(ttl=300)  # Cache for 5 minutes
+def df_to_json_bytes(df: pd.DataFrame) -> bytes:
+    """Encode a results frame as indented JSON records once per distinct result."""
+    if orjson is not None:
+        # Missing values become None so NaN and NaT serialize as null
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        return orjson.dumps(records, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=_json_default)
+    return df.to_json(orient="records", indent=2, date_format="iso").encode('utf-8')
+
+# Node labels the maintenance queries may match on
+EQUIPMENT_LABELS = ('Generator', 'Bus', 'Link')
+
+# Upper-inclusive risk buckets: (-inf, 0.4] Low, (0.4, 0.6] Medium, (0.6, 0.8] High, above 0.8 Critical
+RISK_CRITICALITY_BINS = [-np.inf, 0.4, 0.6, 0.8, np.inf]
+RISK_CRITICALITY_LABELS = ['Low', 'Medium', 'High', 'Critical']
+# Risk chart marker size per criticality label, plus a default for anything else
+RISK_CRITICALITY_SIZES = np.array([5, 10, 15, 20, 10], dtype=np.int8)
+
+def label_risk_criticality(risk_scores: pd.Series) -> pd.Series:
+    """Bucket risk scores into criticality labels in one vectorized pass."""
+    return pd.cut(risk_scores, bins=RISK_CRITICALITY_BINS, labels=RISK_CRITICALITY_LABELS).astype(object)
+
+def style_risk_scores(scores: pd.Series) -> np.ndarray:
+    """Color-code a risk score column for Styler.apply in one vectorized pass."""
+    return np.select(
+        [scores >= 0.8, scores >= 0.6, scores >= 0.4],
+        ['background-color: #ffcccc', 'background-color: #ffebcc', 'background-color: #ffffcc'],
+        default='background-color: #ccffcc'
+    )
+
+def _driver_alive(driver) -> bool:
+    """Check a shared driver can still reach the database before reusing it."""
+    try:
+        driver.verify_connectivity()
+        return True
+    except Exception as e:
+        logger.warning(f"Discarding unusable Neo4j driver: {e}")
+        return False
+
+@st.cache_resource(show_spinner=False, validate=_driver_alive)
+def get_neo4j_driver(uri: str, username: str, password: str, database: str):
+    """Create one pooled, retrying Neo4j driver per connection and share it across reruns."""
+    driver = GraphDatabase.driver(
+        uri,
+        auth=(username, password),
+        max_connection_pool_size=50,
+        connection_acquisition_timeout=30,
+        max_transaction_retry_time=15,
+        keep_alive=True
+    )
+    # Test connection
+    with driver.session(database=database) as session:
+        session.run("RETURN 1 as test")
+    return driver
+
 class CloudEnergyAgentTools:
     """Enhanced tools for energy grid management with cloud optimizations."""
     
@@ -301,50 +344,85 @@ class CloudEnergyAgentTools:
     def _connect(self):
         """Establish connection to Neo4j with cloud-optimized error handling."""
         try:
-            self.driver = GraphDatabase.driver(self.uri, auth=(self.username, self.password))
-            # Test connection
-            with self.driver.session(database=self.database) as session:
-                session.run("RETURN 1 as test")
+            self.driver = get_neo4j_driver(self.uri, self.username, self.password, self.database)
             logger.info("Successfully connected to Neo4j database")
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
             raise
     
     @error_boundary
-    def _execute_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def _execute_query(self, query: str, parameters: Dict[str, Any] = None) -> pd.DataFrame:
         """Execute Cypher query with cloud-optimized error handling."""
         try:
-            with self.driver.session(database=self.database) as session:
-                result = session.run(query, parameters or {})
-                return [dict(record) for record in result]
+            # Managed read transaction: pooled connection, retried on transient errors.
+            # The driver builds the frame column-wise and turns Neo4j dates into datetime64.
+            return self.driver.execute_query(
+                query,
+                parameters or {},
+                routing_=RoutingControl.READ,
+                database_=self.database,
+                result_transformer_=lambda result: result.to_df(parse_dates=True)
+            )
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             raise
     
-    @streamlit_cache_data(ttl=300)  # Cache for 5 minutes
-    def search_equipment_maintenance_records(
-        self, 
+    def _maintenance_match(
+        self,
+        equipment_type: Optional[str],
+        issue_type: Optional[str],
+        days_back: int
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build the filtered maintenance-record MATCH clause shared by the search queries."""
+        # Labels cannot be query parameters, so an allowlisted label is written into
+        # the MATCH pattern where the planner can use it to pick the starting nodes
+        if equipment_type and equipment_type not in EQUIPMENT_LABELS:
+            raise ValueError(f"Unknown equipment type: {equipment_type}")
+        label = equipment_type or "|".join(EQUIPMENT_LABELS)
+        
+        query = f"""
+        MATCH (eq:{label})-[:HAS_MAINTENANCE_RECORD]->(mr:MaintenanceRecord)
+        WHERE mr.date > date() - duration({{days: $days_back}})
+        """
+        
+        params = {'days_back': days_back}
+        
+        if issue_type:
+            query += " AND mr.Type = $issue_type"
+            params['issue_type'] = issue_type
+        
+        return query, params
+    
+    def get_maintenance_counts_by_type(
+        self,
         equipment_type: Optional[str] = None,
         issue_type: Optional[str] = None,
         days_back: int = 365
-    ) -> List[Dict[str, Any]]:
-        """Search equipment maintenance records with cloud caching."""
+    ) -> pd.DataFrame:
+        """Count maintenance records per equipment type in the database."""
         try:
-            query = """
-            MATCH (eq:Generator|Bus|Link)-[:HAS_MAINTENANCE_RECORD]->(mr:MaintenanceRecord)
-            WHERE mr.date > date() - duration({days: $days_back})
+            query, params = self._maintenance_match(equipment_type, issue_type, days_back)
+            query += """
+            RETURN labels(eq)[0] as equipment_type,
+                   count(mr) as maintenance_count
             """
             
-            params = {'days_back': days_back}
-            
-            if equipment_type:
-                query += " AND labels(eq) CONTAINS $equipment_type"
-                params['equipment_type'] = equipment_type
-            
-            if issue_type:
-                query += " AND mr.Type = $issue_type"
-                params['issue_type'] = issue_type
+            df = self._execute_query(query, params)
+            return df if df is not None else pd.DataFrame()
             
+        except Exception as e:
+            logger.error(f"Error counting maintenance records: {e}")
+            return pd.DataFrame()
+    
+    def search_equipment_maintenance_records(
+        self, 
+        equipment_type: Optional[str] = None,
+        issue_type: Optional[str] = None,
+        days_back: int = 365
+    ) -> pd.DataFrame:
+        """Search equipment maintenance records."""
+        try:
+            query, params = self._maintenance_match(equipment_type, issue_type, days_back)
             query += """
             RETURN eq.id as equipment_id,
                    labels(eq)[0] as equipment_type,
@@ -357,50 +435,80 @@ class CloudEnergyAgentTools:
             LIMIT 100
             """
             
-            return self._execute_query(query, params)
+            df = self._execute_query(query, params)
+            return df if df is not None else pd.DataFrame()
             
         except Exception as e:
             logger.error(f"Error searching maintenance records: {e}")
-            return []
+            return pd.DataFrame()
     
-    @streamlit_cache_data(ttl=600)  # Cache for 10 minutes
-    def get_risky_equipment(self, risk_threshold: float = 0.7) -> List[Dict[str, Any]]:
-        """Get equipment with high risk scores with cloud caching."""
+    def get_risky_equipment(self, risk_threshold: float = 0.7) -> pd.DataFrame:
+        """Get equipment with high risk scores."""
         try:
             query = """
             MATCH (eq:Generator|Bus|Link)-[:HAS_MAINTENANCE_RECORD]->(mr:MaintenanceRecord)
             WHERE mr.Type = "Corretivo" AND mr.date > date() - duration({days: 365})
-            WITH eq, collect(mr) as maintenance_records
-            WITH eq, maintenance_records, size(maintenance_records) as maintenance_count
-            WITH eq, maintenance_records, maintenance_count,
-                 maintenance_count * 1.0 / 365 as risk_score
+            WITH eq, count(mr) as maintenance_count
+            WITH eq, maintenance_count, maintenance_count * 1.0 / 365 as risk_score
             WHERE risk_score >= $risk_threshold
             RETURN eq.id as equipment_id,
                    labels(eq)[0] as equipment_type,
                    eq.name_eng as equipment_name,
                    risk_score,
-                   maintenance_count,
-                   CASE 
-                       WHEN risk_score > 0.8 THEN 'Critical'
-                       WHEN risk_score > 0.6 THEN 'High'
-                       WHEN risk_score > 0.4 THEN 'Medium'
-                       ELSE 'Low'
-                   END as equipment_criticality
+                   maintenance_count
             ORDER BY risk_score DESC
             LIMIT 50
             """
             
-            return self._execute_query(query, {'risk_threshold': risk_threshold})
+            df = self._execute_query(query, {'risk_threshold': risk_threshold})
+            if df is None:
+                return pd.DataFrame()
+            
+            # Criticality labels are bucketed client-side instead of a per-row CASE
+            if not df.empty:
+                df['equipment_criticality'] = label_risk_criticality(df['risk_score'])
+            
+            return df
             
         except Exception as e:
             logger.error(f"Error getting risky equipment: {e}")
-            return []
+            return pd.DataFrame()
     
     def close(self):
-        """Close database connection."""
-        if self.driver:
-            self.driver.close()
-            logger.info("Database connection closed")
+        """Release this instance's handle on the shared database driver."""
+        # The pooled driver is owned by get_neo4j_driver and reused across sessions
+        self.driver = None
+
+# Query caches live at module level: Streamlit skips hashing the underscore-prefixed
+# tools argument, so each entry is keyed on the connection and filters alone
+@streamlit_cache_data(ttl=300, show_spinner=False)  # Cache for 5 minutes
+def maintenance_counts_frame(
+    _tools: CloudEnergyAgentTools,
+    uri: str,
+    database: str,
+    equipment_type: Optional[str],
+    issue_type: Optional[str],
+    days_back: int
+) -> pd.DataFrame:
+    """Cached per-type maintenance counts for the equipment analysis chart."""
+    return _tools.get_maintenance_counts_by_type(equipment_type, issue_type, days_back)
+
+@streamlit_cache_data(ttl=300, show_spinner=False)  # Cache for 5 minutes
+def maintenance_records_frame(
+    _tools: CloudEnergyAgentTools,
+    uri: str,
+    database: str,
+    equipment_type: Optional[str],
+    issue_type: Optional[str],
+    days_back: int
+) -> pd.DataFrame:
+    """Cached maintenance record detail for the equipment analysis table and exports."""
+    return _tools.search_equipment_maintenance_records(equipment_type, issue_type, days_back)
+
+@streamlit_cache_data(ttl=600, show_spinner=False)  # Cache for 10 minutes
+def risky_equipment_frame(_tools: CloudEnergyAgentTools, uri: str, database: str, risk_threshold: float) -> pd.DataFrame:
+    """Cached high-risk equipment for the risk assessment view."""
+    return _tools.get_risky_equipment(risk_threshold)
 
 def display_startup_health_check():
     """Display startup health check and initialization status."""
@@ -501,29 +609,16 @@ def main():
                 st.error(f"❌ Failed to connect to database: {e}")
                 return
         
-        # Create tabs for different functionalities
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
-            "🔧 Equipment Analysis", 
-            "⚠️ Risk Assessment", 
-            "🔗 Dependencies", 
-            "📅 Maintenance Scheduling",
-            "📈 Vibration Analysis"
-        ])
-        
-        with tab1:
-            show_equipment_analysis()
-        
-        with tab2:
-            show_risk_assessment()
-        
-        with tab3:
-            show_dependencies()
-        
-        with tab4:
-            show_maintenance_scheduling()
-        
-        with tab5:
-            show_vibration_analysis()
+        # Only the selected view runs; st.tabs would execute every tab's queries
+        # and charts on each rerun even though just one tab is visible
+        active_tab = st.radio(
+            "View",
+            list(DASHBOARD_VIEWS),
+            horizontal=True,
+            key="active_tab",
+            label_visibility="collapsed"
+        )
+        DASHBOARD_VIEWS[active_tab]()
         
         # Footer
         st.markdown("---")
@@ -584,68 +679,76 @@ def show_equipment_analysis():
         )
     
     # Search button
-    if st.button("🔍 Search Maintenance Records", type="primary"):
+    searched = st.button("🔍 Search Maintenance Records", type="primary")
+    if searched:
+        # Log search action
+        if 'cloud_logger' in st.session_state:
+            st.session_state.cloud_logger.log_user_action("search_maintenance_records", {
+                "equipment_type": equipment_type,
+                "issue_type": issue_type,
+                "days_back": days_back
+            })
+        
+        # Keep the filters so the results survive reruns from the widgets below
+        st.session_state.maintenance_search = {
+            "equipment_type": None if equipment_type == "All" else equipment_type,
+            "issue_type": None if issue_type == "All" else issue_type,
+            "days_back": days_back
+        }
+    
+    search = st.session_state.get('maintenance_search')
+    if search:
         with st.spinner("Searching maintenance records..."):
             try:
-                # Log search action
-                if 'cloud_logger' in st.session_state:
-                    st.session_state.cloud_logger.log_user_action("search_maintenance_records", {
-                        "equipment_type": equipment_type,
-                        "issue_type": issue_type,
-                        "days_back": days_back
-                    })
+                tools = st.session_state.energy_tools
                 
-                # Get equipment type filter
-                eq_type_filter = None if equipment_type == "All" else equipment_type
-                issue_filter = None if issue_type == "All" else issue_type
+                # The chart only needs per-type totals, aggregated in Cypher
+                type_counts = maintenance_counts_frame(tools, tools.uri, tools.database, **search)
                 
-                # Search records
-                records = st.session_state.energy_tools.search_equipment_maintenance_records(
-                    equipment_type=eq_type_filter,
-                    issue_type=issue_filter,
-                    days_back=days_back
-                )
-                
-                if records:
-                    st.success(f"✅ Found {len(records)} maintenance records")
+                if not type_counts.empty:
+                    record_count = int(type_counts['maintenance_count'].sum())
+                    st.success(f"✅ Found {record_count} maintenance records")
                     
                     # Log successful search
-                    if 'cloud_logger' in st.session_state:
+                    if searched and 'cloud_logger' in st.session_state:
                         st.session_state.cloud_logger.log_structured_event("search_completed", {
-                            "record_count": len(records),
+                            "record_count": record_count,
                             "filters": {"equipment_type": equipment_type, "issue_type": issue_type, "days_back": days_back}
                         })
                     
                     # Create chart
-                    chart = create_maintenance_chart(records)
+                    chart = create_maintenance_chart(type_counts)
                     if chart:
                         st.plotly_chart(chart, use_container_width=True)
                     
-                    # Display data table
-                    df = pd.DataFrame(records)
-                    st.dataframe(df, use_container_width=True)
-                    
-                    # Export options
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        csv = df.to_csv(index=False)
-                        st.download_button(
-                            "📥 Download CSV",
-                            csv,
-                            "maintenance_records.csv",
-                            "text/csv",
-                            key="download_csv"
-                        )
-                    
-                    with col2:
-                        json_str = df.to_json(orient="records", indent=2)
-                        st.download_button(
-                            "📥 Download JSON",
-                            json_str,
-                            "maintenance_records.json",
-                            "application/json",
-                            key="download_json"
-                        )
+                    # Record detail is only queried when the table is opened
+                    if st.checkbox("🔍 View Raw Records", key="show_maintenance_records"):
+                        df = maintenance_records_frame(tools, tools.uri, tools.database, **search)
+                        st.caption(f"Latest {len(df)} records")
+                        st.dataframe(df, use_container_width=True)
+                        
+                        # Export options
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            # Bytes, so Streamlit does not re-encode the CSV text on every rerun
+                            csv = df_to_csv_bytes(df)
+                            st.download_button(
+                                "📥 Download CSV",
+                                csv,
+                                "maintenance_records.csv",
+                                "text/csv",
+                                key="download_csv"
+                            )
+                        
+                        with col2:
+                            json_bytes = df_to_json_bytes(df)
+                            st.download_button(
+                                "📥 Download JSON",
+                                json_bytes,
+                                "maintenance_records.json",
+                                "application/json",
+                                key="download_json"
+                            )
                 else:
                     st.info("ℹ️ No maintenance records found for the selected criteria.")
                     
@@ -683,9 +786,11 @@ def show_risk_assessment():
                         "risk_threshold": risk_threshold
                     })
                 
-                risky_equipment = st.session_state.energy_tools.get_risky_equipment(risk_threshold)
+                tools = st.session_state.energy_tools
+                # Rounded so slider float noise does not split cache entries
+                risky_equipment = risky_equipment_frame(tools, tools.uri, tools.database, round(risk_threshold, 2))
                 
-                if risky_equipment:
+                if not risky_equipment.empty:
                     st.success(f"✅ Found {len(risky_equipment)} high-risk equipment items")
                     
                     # Log successful analysis
@@ -701,20 +806,10 @@ def show_risk_assessment():
                         st.plotly_chart(chart, use_container_width=True)
                     
                     # Display risk table
-                    df = pd.DataFrame(risky_equipment)
+                    df = risky_equipment
                     
                     # Color code risk scores
-                    def color_risk_score(val):
-                        if val >= 0.8:
-                            return 'background-color: #ffcccc'
-                        elif val >= 0.6:
-                            return 'background-color: #ffebcc'
-                        elif val >= 0.4:
-                            return 'background-color: #ffffcc'
-                        else:
-                            return 'background-color: #ccffcc'
-                    
-                    styled_df = df.style.applymap(color_risk_score, subset=['risk_score'])
+                    styled_df = df.style.apply(style_risk_scores, subset=['risk_score'])
                     st.dataframe(styled_df, use_container_width=True)
                     
                 else:
@@ -782,5 +877,14 @@ def show_vibration_analysis():
     *Feature coming soon...*
     """)
 
+# Dashboard views in display order
+DASHBOARD_VIEWS = {
+    "🔧 Equipment Analysis": show_equipment_analysis,
+    "⚠️ Risk Assessment": show_risk_assessment,
+    "🔗 Dependencies": show_dependencies,
+    "📅 Maintenance Scheduling": show_maintenance_scheduling,
+    "📈 Vibration Analysis": show_vibration_analysis
+}
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -261,10 +261,12 @@ def export_data_to_csv(data: List[Dict[str, Any]], filename: str) -> str:
         return None
     
     df = pd.DataFrame(data)
-    csv = df.to_csv(index=False)
+    # Write straight to bytes; the base64 link needs bytes anyway
+    buffer = BytesIO()
+    df.to_csv(buffer, index=False, encoding='utf-8')
     
     # Create download link
-    b64 = base64.b64encode(csv.encode()).decode()
+    b64 = base64.b64encode(buffer.getvalue()).decode()
     href = f'<a href="data:file/csv;base64,{b64}" download="{filename}.csv" class="export-button">📥 Download CSV</a>'
     
     return href
@@ -495,11 +497,20 @@ def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
         
         df['size'] = df.get('equipment_criticality', 'Medium').map(criticality_size_map).fillna(10)
         
+        # Per-point criticality for hover text
+        if 'equipment_criticality' in df.columns:
+            df['criticality_label'] = df['equipment_criticality'].fillna('Unknown')
+        else:
+            df['criticality_label'] = 'Unknown'
+        
         # Create scatter plot
         fig = go.Figure()
         
+        # Shared color range so the single colorbar is valid for every trace
+        risk_min, risk_max = df['risk_score'].min(), df['risk_score'].max()
+        
         # Group by equipment type for better visualization
-        for eq_type in df['equipment_type'].unique():
+        for i, eq_type in enumerate(df['equipment_type'].unique()):
             type_data = df[df['equipment_type'] == eq_type]
             
             fig.add_trace(go.Scatter(
@@ -510,15 +521,18 @@ def create_risk_chart(risk_data: List[Dict[str, Any]]) -> Optional[go.Figure]:
                     size=type_data['size'],
                     color=type_data['risk_score'],
                     colorscale='reds',
-                    showscale=True,
-                    colorbar=dict(title="Risk Score")
+                    cmin=risk_min,
+                    cmax=risk_max,
+                    showscale=(i == 0),
+                    colorbar=dict(title="Risk Score") if i == 0 else None
                 ),
                 text=type_data.get('equipment_name', ''),
+                customdata=type_data['criticality_label'],
                 hovertemplate=(
                     "<b>Equipment:</b> %{text}<br>" +
                     "<b>Type:</b> " + eq_type + "<br>" +
                     "<b>Risk Score:</b> %{y:.3f}<br>" +
-                    "<b>Criticality:</b> " + type_data.get('equipment_criticality', 'Unknown').iloc[0] + "<br>" +
+                    "<b>Criticality:</b> %{customdata}<br>" +
                     "<extra></extra>"
                 ),
                 name=eq_type,
@@ -587,8 +601,9 @@ def create_timeline_chart(maintenance_data: List[Dict[str, Any]]) -> Optional[go
         if 'maintenance_date' not in df.columns:
             return None
         
-        # Convert dates and sort
-        df['maintenance_date'] = pd.to_datetime(df['maintenance_date'])
+        # Convert dates (unless already parsed) and sort
+        if not pd.api.types.is_datetime64_any_dtype(df['maintenance_date']):
+            df['maintenance_date'] = pd.to_datetime(df['maintenance_date'], format='ISO8601')
         df = df.sort_values('maintenance_date')
         
         if df.empty:
@@ -1563,11 +1578,11 @@ def show_risk_assessment():
                         st.metric("Highest Risk Score", f"{max_risk:.2f}")
                     
                     with col3:
-                        critical_count = len(df[df['criticality'] == 'Critical'])
+                        critical_count = int((df['criticality'] == 'Critical').sum())
                         st.metric("Critical Equipment", critical_count)
                     
                     with col4:
-                        high_risk_count = len(df[df['risk_score'] >= 8.0])
+                        high_risk_count = int((df['risk_score'] >= 8.0).sum())
                         st.metric("Very High Risk", high_risk_count)
                     
                     # Recommendations
@@ -1724,11 +1739,11 @@ def show_maintenance_scheduling():
                         st.metric("Avg Duration (hours)", f"{avg_duration:.1f}")
                     
                     with col3:
-                        priority_tasks = len(df[df['priority'] == 'High']) if 'priority' in df.columns else 0
+                        priority_tasks = int((df['priority'] == 'High').sum()) if 'priority' in df.columns else 0
                         st.metric("High Priority Tasks", priority_tasks)
                     
                     with col4:
-                        urgent_tasks = len(df[df['urgency'] == 'Immediate']) if 'urgency' in df.columns else 0
+                        urgent_tasks = int((df['urgency'] == 'Immediate').sum()) if 'urgency' in df.columns else 0
                         st.metric("Immediate Tasks", urgent_tasks)
                     
                     # Timeline visualization
@@ -1829,7 +1844,7 @@ def show_vibration_analysis():
                         st.metric("Peak Vibration", f"{max_vibration:.2f} mm/s")
                     
                     with col3:
-                        above_threshold = len(df[df['vibration_level'] > vibration_threshold]) if 'vibration_level' in df.columns else 0
+                        above_threshold = int((df['vibration_level'] > vibration_threshold).sum()) if 'vibration_level' in df.columns else 0
                         st.metric("Above Threshold", above_threshold)
                     
                     with col4:
@@ -15,6 +15,9 @@ from config import Config
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# analyze_grid_data reports API errors in-band with this prefix instead of raising
+ANALYSIS_FAILED_PREFIX = "Analysis failed:"
+
 class ClaudeAnalysisError(Exception):
     """Custom exception for Claude analysis errors."""
     pass
@@ -182,6 +185,31 @@ def validate_claude_api_key(api_key: str) -> bool:
 # DATA SUMMARIZATION HELPERS
 # ============================================================================
 
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse a date column to datetime64, skipping columns that already are.
+    
+    Args:
+        values: Column of date strings, neo4j.time values or datetimes
+        
+    Returns:
+        datetime64 Series with unparseable values as NaT
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    # neo4j.time values are not convertible directly but print as ISO 8601;
+    # an explicit format keeps pandas on its vectorized parser
+    strings = values.astype('string')
+    parsed = pd.to_datetime(strings, format='ISO8601', errors='coerce', cache=True)
+    missed = parsed.isna() & strings.notna()
+    if missed.any():
+        # Infer formats only for the non-ISO leftovers, e.g. "01/15/2024";
+        # leftovers whose timezone awareness differs from the rest stay NaT
+        fallback = pd.to_datetime(strings[missed], format='mixed', errors='coerce')
+        if fallback.dtype == parsed.dtype:
+            parsed[missed] = fallback
+    return parsed
+
 def _summarize_dataframe(df: pd.DataFrame, max_rows: int = 1000) -> Dict[str, Any]:
     """
     Create a comprehensive summary of a DataFrame.
@@ -317,7 +345,7 @@ def _create_detailed_vibration_summary(vibration_data: List[Dict[str, Any]]) ->
         
         # Date range analysis
         if 'maintenance_date' in df.columns:
-            df['maintenance_date'] = pd.to_datetime(df['maintenance_date'])
+            df['maintenance_date'] = parse_dates(df['maintenance_date'])
             date_range = df['maintenance_date'].max() - df['maintenance_date'].min()
             summary["analysis_period_days"] = date_range.days
             summary["date_range"] = {
@@ -459,7 +487,7 @@ class AdvancedClaudeAnalyzer:
             
             # Add trend-specific analysis
             if 'maintenance_date' in df.columns:
-                df['maintenance_date'] = pd.to_datetime(df['maintenance_date'])
+                df['maintenance_date'] = parse_dates(df['maintenance_date'])
                 df['month'] = df['maintenance_date'].dt.to_period('M')
                 
                 monthly_trends = df.groupby('month').agg({
@@ -530,12 +558,13 @@ class AdvancedClaudeAnalyzer:
             # Add threshold-specific analysis
             df = pd.DataFrame(risk_data)
             if 'risk_score' in df.columns:
-                high_risk_equipment = df[df['risk_score'] >= risk_threshold]
+                high_risk_mask = df['risk_score'] >= risk_threshold
+                high_risk_count = int(high_risk_mask.sum())
                 risk_summary["threshold_analysis"] = {
                     "threshold": risk_threshold,
-                    "high_risk_count": len(high_risk_equipment),
-                    "high_risk_percentage": len(high_risk_equipment) / len(df) * 100,
-                    "critical_equipment": len(high_risk_equipment[high_risk_equipment['equipment_criticality'] == 'Critical']) if 'equipment_criticality' in df.columns else 0
+                    "high_risk_count": high_risk_count,
+                    "high_risk_percentage": high_risk_count / len(df) * 100,
+                    "critical_equipment": int((high_risk_mask & (df['equipment_criticality'] == 'Critical')).sum()) if 'equipment_criticality' in df.columns else 0
                 }
             
             # Create analysis prompt
@@ -667,7 +696,7 @@ class AdvancedClaudeAnalyzer:
             # Add failure pattern analysis
             df_maintenance = pd.DataFrame(maintenance_data)
             if 'maintenance_date' in df_maintenance.columns and 'equipment_id' in df_maintenance.columns:
-                df_maintenance['maintenance_date'] = pd.to_datetime(df_maintenance['maintenance_date'])
+                df_maintenance['maintenance_date'] = parse_dates(df_maintenance['maintenance_date'])
                 
                 # Calculate time between maintenance for each equipment
                 equipment_maintenance_gaps = {}
@@ -767,7 +796,7 @@ class ClaudeClient:
             
         except Exception as e:
             logger.error(f"Error in grid data analysis: {e}")
-            return f"Analysis failed: {e}"
+            return f"{ANALYSIS_FAILED_PREFIX} {e}"
     
     def get_advanced_analyzer(self) -> AdvancedClaudeAnalyzer:
         """
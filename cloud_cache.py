@@ -198,11 +198,12 @@ def cloud_cache(ttl: int = None, key_prefix: str = ""):
         return wrapper
     return decorator
 
-def streamlit_cache_data(ttl: int = 300, max_entries: int = 100):
+def streamlit_cache_data(ttl: int = 300, max_entries: int = 100, show_spinner: bool = True):
     """
     Streamlit's built-in cache_data with cloud optimizations.
+    Arguments whose names start with an underscore are not hashed into the key.
     """
-    return st.cache_data(ttl=ttl, max_entries=max_entries)
+    return st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=show_spinner)
 
 def streamlit_cache_resource(ttl: int = 300, max_entries: int = 100):
     """
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Database Index Setup for the Energy Grid Management Agent
+Creates the Neo4j indexes behind the application's equipment type and
+maintenance date lookups. Run once per database, as a user allowed to
+change the schema; the application itself only reads.
+"""
+
+import os
+import sys
+import logging
+
+from neo4j import GraphDatabase
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Range indexes behind the equipment type and maintenance date predicates
+LOOKUP_INDEXES = (
+    "CREATE INDEX equipment_type IF NOT EXISTS FOR (e:Equipment) ON (e.type)",
+    "CREATE INDEX maintenance_date IF NOT EXISTS FOR (m:MaintenanceRecord) ON (m.date)",
+)
+
+def create_indexes(driver, database: str) -> int:
+    """
+    Create any missing lookup indexes.
+    
+    Args:
+        driver: Neo4j driver for a user with schema privileges
+        database: Neo4j database name
+    
+    Returns:
+        Number of index statements that failed
+    """
+    failures = 0
+    for statement in LOOKUP_INDEXES:
+        try:
+            driver.execute_query(statement, database_=database)
+            logger.info(f"OK: {statement}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"Could not create index ({statement}): {e}")
+    return failures
+
+def main():
+    """Create the indexes in the database configured through NEO4J_* environment variables."""
+    # Read the connection directly: config.Config also insists on unrelated settings such as CLAUDE_API_KEY
+    uri = os.getenv('NEO4J_URI', 'neo4j://localhost:7687')
+    auth = (os.getenv('NEO4J_USERNAME', 'neo4j'), os.getenv('NEO4J_PASSWORD', ''))
+    with GraphDatabase.driver(uri, auth=auth) as driver:
+        failures = create_indexes(driver, os.getenv('NEO4J_DATABASE', 'neo4j'))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
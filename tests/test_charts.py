@@ -0,0 +1,294 @@
+"""
+Unit tests for the chart and results-frame helpers in the main application
+"""
+import unittest
+from unittest.mock import Mock
+import io
+import json
+import sys
+import os
+import numpy as np
+import pandas as pd
+from neo4j.time import Date, DateTime
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import (
+    records_to_frame, summarize_maintenance, summarize_vibration, category_stats, style_risk_scores, df_to_csv_bytes,
+    replace_columns, vibration_analysis, risk_results_frame,
+    create_maintenance_chart, create_risk_chart, create_timeline_chart,
+    create_count_bar_chart, create_monthly_line_chart, create_histogram_chart
+)
+
+
+class TestChartHelpers(unittest.TestCase):
+    """Test cases for the create_*_chart helpers."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.sample_records = [
+            {
+                "equipment_id": "EQ-001",
+                "equipment_type": "Generator",
+                "equipment_name": "Generator Alpha",
+                "equipment_criticality": "Critical",
+                "maintenance_date": "2024-01-15",
+                "maintenance_type": "Preventive",
+                "risk_score": 0.85
+            },
+            {
+                "equipment_id": "EQ-002",
+                "equipment_type": "Generator",
+                "equipment_name": "Generator Beta",
+                "equipment_criticality": "Low",
+                "maintenance_date": "2024-02-10",
+                "maintenance_type": "Corrective",
+                "risk_score": 0.72
+            },
+            {
+                "equipment_id": "EQ-003",
+                "equipment_type": "Transformer",
+                "equipment_name": "Transformer Gamma",
+                "equipment_criticality": "High",
+                "maintenance_date": "2024-03-05",
+                "maintenance_type": "Predictive",
+                "risk_score": 0.91
+            }
+        ]
+        self.df = records_to_frame(self.sample_records)
+    
+    def test_maintenance_chart_counts_most_frequent_first(self):
+        """Test maintenance counts per equipment type, sorted by count."""
+        figure = json.loads(create_maintenance_chart(self.df).to_json())
+        
+        trace = figure["data"][0]
+        self.assertEqual(list(trace["x"]), ["Generator", "Transformer"])
+        self.assertEqual(list(trace["y"]), [2, 1])
+    
+    def test_risk_chart_hover_criticality_per_point(self):
+        """Test each risk point carries its own criticality, not its group's first row."""
+        figure = json.loads(create_risk_chart(self.df).to_json())
+        
+        # Verify a single trace with one colorbar
+        self.assertEqual(len(figure["data"]), 1)
+        trace = figure["data"][0]
+        
+        # Verify per-point hover data
+        self.assertEqual(
+            [row[1] for row in trace["customdata"]],
+            ["Critical", "Low", "High"]
+        )
+        self.assertIn("%{customdata[1]}", trace["hovertemplate"])
+    
+    def test_risk_chart_without_optional_columns(self):
+        """Test the risk chart falls back to default sizes and names when columns are absent."""
+        df = self.df.drop(columns=['equipment_criticality', 'equipment_name'])
+        figure = json.loads(create_risk_chart(df).to_json())
+        
+        trace = figure["data"][0]
+        self.assertEqual(list(trace["marker"]["size"]), [10, 10, 10])
+        self.assertEqual(list(trace["text"]), ["", "", ""])
+    
+    def test_risk_chart_unknown_criticality(self):
+        """Test unmapped or missing criticality falls back to the default marker size."""
+        records = [
+            dict(self.sample_records[0], equipment_criticality="Critical"),
+            dict(self.sample_records[1], equipment_criticality="Unrated"),
+            dict(self.sample_records[2], equipment_criticality=None)
+        ]
+        figure = json.loads(create_risk_chart(records_to_frame(records)).to_json())
+        
+        self.assertEqual(list(figure["data"][0]["marker"]["size"]), [20, 10, 10])
+    
+    def test_timeline_chart_hover_maintenance_type_per_point(self):
+        """Test each timeline point carries its own maintenance type."""
+        figure = json.loads(create_timeline_chart(self.df).to_json())
+        
+        trace = figure["data"][0]
+        self.assertEqual(
+            [row[1] for row in trace["customdata"]],
+            ["Preventive", "Corrective", "Predictive"]
+        )
+    
+    def test_timeline_chart_more_types_than_palette(self):
+        """Test the timeline palette cycles instead of failing past 12 equipment types."""
+        records = [
+            dict(self.sample_records[0], equipment_id=f"EQ-{i:03d}", equipment_type=f"Type {i:02d}")
+            for i in range(15)
+        ]
+        figure = json.loads(create_timeline_chart(records_to_frame(records)).to_json())
+        
+        # One data trace plus one legend entry per equipment type
+        self.assertEqual(len(figure["data"]), 16)
+        colors = figure["data"][0]["marker"]["color"]
+        self.assertEqual(colors[12], colors[0])
+    
+    def test_records_to_frame_parses_neo4j_dates(self):
+        """Test neo4j.time.Date values become datetime64 instead of failing to parse."""
+        records = [
+            dict(self.sample_records[0], maintenance_date=Date(2024, 1, 15)),
+            dict(self.sample_records[1], maintenance_date=None)
+        ]
+        df = records_to_frame(records)
+        
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['maintenance_date']))
+        self.assertEqual(df['maintenance_date'].iloc[0], pd.Timestamp("2024-01-15"))
+        self.assertTrue(pd.isna(df['maintenance_date'].iloc[1]))
+    
+    def test_records_to_frame_neo4j_datetimes(self):
+        """Test neo4j.time.DateTime records frame without hitting Streamlit's argument hashing."""
+        records = [
+            dict(self.sample_records[0], maintenance_date=DateTime(2024, 1, 15, 10, 30, 0)),
+            dict(self.sample_records[1], maintenance_date=DateTime(2024, 1, 16, 0, 0, 0))
+        ]
+        df = records_to_frame(records)
+        
+        self.assertEqual(df['maintenance_date'].iloc[0], pd.Timestamp("2024-01-15 10:30:00"))
+        self.assertEqual(df['maintenance_date'].iloc[1], pd.Timestamp("2024-01-16"))
+    
+    def test_summarize_maintenance_counts(self):
+        """Test the cached summary groups records by type, month and maintenance type."""
+        summary = summarize_maintenance(self.df)
+        
+        self.assertEqual(summary["type_counts"]["Generator"], 2)
+        self.assertEqual(
+            list(summary["monthly_counts"]["maintenance_date"]),
+            list(pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"]))
+        )
+        self.assertEqual(list(summary["monthly_counts"]["count"]), [1, 1, 1])
+        self.assertEqual(summary["maint_type_counts"].sum(), 3)
+    
+    def test_summarize_vibration_metrics(self):
+        """Test vibration metrics come from one aggregation and default to 0 for missing columns."""
+        df = self.df.assign(maintenance_cost=[100.0, 300.0, None])
+        metrics = summarize_vibration(df)
+        
+        self.assertEqual(metrics["issue_count"], 3)
+        self.assertEqual(metrics["affected_equipment"], 3)
+        self.assertEqual(metrics["equipment_types"], 2)
+        self.assertEqual(metrics["avg_cost"], 200.0)
+        self.assertEqual((metrics["min_cost"], metrics["max_cost"], metrics["total_cost"]), (100.0, 300.0, 400.0))
+        
+        self.assertEqual(summarize_vibration(self.df)["total_cost"], 0)
+    
+    def test_vibration_analysis_returns_typed_frame_and_summary(self):
+        """Test the cached vibration analysis parses dates and bundles the page summary."""
+        tools = Mock()
+        tools.get_vibration_analysis.return_value = pd.DataFrame(self.sample_records)
+        df, summary = vibration_analysis(tools, "neo4j://test", "neo4j", 90)
+        
+        tools.get_vibration_analysis.assert_called_once_with(days_back=90, as_df=True)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['maintenance_date']))
+        self.assertEqual(summary["issue_count"], 3)
+        self.assertEqual(summary["type_counts"]["Generator"], 2)
+        self.assertEqual(len(summary["monthly_counts"]), 3)
+        
+        tools.get_vibration_analysis.return_value = pd.DataFrame()
+        df, summary = vibration_analysis(tools, "neo4j://test", "neo4j", 30)
+        self.assertTrue(df.empty)
+        self.assertEqual(summary, {})
+    
+    def test_results_frame_does_not_cache_query_failures(self):
+        """Test a failed query raises through the frame cache and the retry queries again."""
+        risk_results_frame.clear()
+        tools = Mock()
+        tools.get_risky_equipment.side_effect = [RuntimeError("Database query failed"), self.sample_records]
+        
+        with self.assertRaises(RuntimeError):
+            risk_results_frame(tools, "neo4j://test", "neo4j", 0.7)
+        
+        df = risk_results_frame(tools, "neo4j://test", "neo4j", 0.7)
+        self.assertEqual(len(df), 3)
+        self.assertEqual(tools.get_risky_equipment.call_count, 2)
+    
+    def test_category_stats_matches_groupby(self):
+        """Test per-type counts and mean risk match pandas groupby results."""
+        stats = category_stats(self.df['equipment_type'], self.df['risk_score'])
+        expected = self.df.groupby('equipment_type', observed=True)['risk_score'].agg(['count', 'mean'])
+        
+        self.assertEqual(list(stats.index), list(expected.index))
+        self.assertEqual(list(stats['count']), list(expected['count']))
+        self.assertTrue(np.allclose(stats['mean'], expected['mean']))
+    
+    def test_style_risk_scores_buckets(self):
+        """Test risk score styles use the same lower-inclusive thresholds as the legend."""
+        styles = style_risk_scores(pd.Series([0.2, 0.4, 0.6, 0.8, None]))
+        
+        self.assertIn('#90EE90', styles[0])
+        self.assertIn('#ffff00', styles[1])
+        self.assertIn('#ffaa00', styles[2])
+        self.assertIn('#ff4444', styles[3])
+        self.assertEqual(styles[4], '')
+    
+    def test_aggregate_chart_builders(self):
+        """Test the graph_objects builders render pre-aggregated inputs."""
+        summary = summarize_maintenance(self.df)
+        bar = json.loads(create_count_bar_chart(summary["type_counts"], "Frequency", "Type", "Count").to_json())
+        self.assertEqual(bar["data"][0]["type"], "bar")
+        self.assertEqual(sorted(bar["data"][0]["x"]), ["Generator", "Transformer"])
+        
+        histogram = json.loads(create_histogram_chart(self.df['risk_score'], "Risk", "Score", "Count", threshold=0.7).to_json())
+        self.assertEqual(histogram["data"][0]["nbinsx"], 20)
+        self.assertEqual(histogram["layout"]["shapes"][0]["x0"], 0.7)
+        
+        histogram = json.loads(create_histogram_chart(self.df['risk_score'], "Risk", "Score", "Count", nbins=15).to_json())
+        self.assertEqual(histogram["data"][0]["nbinsx"], 15)
+        
+        line = json.loads(create_monthly_line_chart(summary["monthly_counts"], title="Issues", y_title="Issue Count").to_json())
+        self.assertEqual(line["layout"]["title"]["text"], "Issues")
+        self.assertEqual(list(line["data"][0]["y"]), [1, 1, 1])
+    
+    def test_df_to_csv_bytes_round_trip(self):
+        """Test the CSV export reads back the same as pandas' own CSV, with plain dates."""
+        csv_bytes = df_to_csv_bytes(self.df)
+        
+        self.assertIn(b"2024-01-15", csv_bytes)
+        self.assertNotIn(b"00:00:00", csv_bytes)
+        pd.testing.assert_frame_equal(
+            pd.read_csv(io.BytesIO(csv_bytes)),
+            pd.read_csv(io.StringIO(self.df.to_csv(index=False)))
+        )
+    
+    def test_df_to_csv_bytes_matches_pandas_output(self):
+        """Test the CSV export is byte-identical to df.to_csv, including quoting and tz-aware timestamps."""
+        df = pd.DataFrame({
+            "equipment_id": ["EQ-001", "EQ,002", 'EQ"003'],
+            "maintenance_cost": [100.0, None, 0.5],
+            "resolved": [True, False, True],
+            "maintenance_date": pd.to_datetime(["2024-01-05", None, "2024-01-06"]),
+            "logged_at": pd.to_datetime(["2024-01-05 10:30:00", None, "2024-01-06 00:00:00"]).tz_localize("UTC")
+        })
+        
+        self.assertEqual(df_to_csv_bytes(df), df.to_csv(index=False).encode('utf-8'))
+        self.assertIn(b"2024-01-05 10:30:00+00:00", df_to_csv_bytes(df))
+        self.assertEqual(df_to_csv_bytes(self.df), self.df.to_csv(index=False).encode('utf-8'))
+    
+    def test_df_to_csv_bytes_list_columns(self):
+        """Test frames with list columns still export through the pandas writer."""
+        df = pd.DataFrame({"equipment_id": ["EQ-001"], "dependent_equipment": [["EQ-002", "EQ-003"]]})
+        
+        self.assertEqual(df_to_csv_bytes(df), df.to_csv(index=False).encode('utf-8'))
+    
+    def test_replace_columns_shares_untouched_columns(self):
+        """Test display formatting replaces columns without copying or mutating the source."""
+        display_df = replace_columns(self.df, {"risk_score": self.df['risk_score'].map("{:.1f}".format)})
+        
+        self.assertEqual(list(display_df['risk_score']), ["0.8", "0.7", "0.9"])
+        self.assertEqual(self.df['risk_score'].dtype, np.float64)
+        self.assertEqual(list(display_df.columns), list(self.df.columns))
+        self.assertTrue(np.shares_memory(
+            display_df['maintenance_date'].to_numpy(), self.df['maintenance_date'].to_numpy()
+        ))
+    
+    def test_charts_empty_frame(self):
+        """Test chart helpers return None for empty input."""
+        empty_df = records_to_frame([])
+        
+        self.assertIsNone(create_risk_chart(empty_df))
+        self.assertIsNone(create_timeline_chart(empty_df))
+        self.assertIsNone(create_count_bar_chart(pd.Series(dtype='int64'), "Frequency", "Type", "Count"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,8 @@ import os
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import EnergyAgentTools
+from app import EnergyAgentTools, _driver_alive, _tools_alive, cached_maintenance_analysis
+from claude_utils import ClaudeAnalysisError
 from neo4j.exceptions import ServiceUnavailable, AuthError, ClientError
 
 
@@ -240,9 +241,9 @@ class TestEnergyAgentTools(unittest.TestCase):
             database=self.mock_database
         )
         
-        # Test that exception is handled and empty list is returned
-        result = tools.search_equipment_maintenance_records()
-        self.assertEqual(result, [])
+        # Test that the failure propagates instead of reading as no results
+        with self.assertRaises(RuntimeError):
+            tools.search_equipment_maintenance_records()
     
     @patch('app.GraphDatabase')
     def test_get_risky_equipment_success(self, mock_graph_database):
@@ -299,9 +300,9 @@ class TestEnergyAgentTools(unittest.TestCase):
             database=self.mock_database
         )
         
-        # Test that exception is handled and empty list is returned
-        result = tools.get_risky_equipment()
-        self.assertEqual(result, [])
+        # Test that the failure propagates instead of reading as no results
+        with self.assertRaises(RuntimeError):
+            tools.get_risky_equipment()
     
     @patch('app.GraphDatabase')
     def test_get_installation_equipments_dependency_success(self, mock_graph_database):
@@ -390,9 +391,9 @@ class TestEnergyAgentTools(unittest.TestCase):
             database=self.mock_database
         )
         
-        # Test that exception is handled and empty list is returned
-        result = tools.get_installation_equipments_dependency()
-        self.assertEqual(result, [])
+        # Test that the failure propagates instead of reading as no results
+        with self.assertRaises(RuntimeError):
+            tools.get_installation_equipments_dependency()
     
     @patch('app.GraphDatabase')
     def test_get_vibration_analysis_success(self, mock_graph_database):
@@ -494,6 +495,114 @@ class TestEnergyAgentTools(unittest.TestCase):
         # Verify query was executed
         mock_session.run.assert_called()
     
+    @patch('app.GraphDatabase')
+    def test_execute_query_as_dataframe(self, mock_graph_database):
+        """Test _execute_query builds a DataFrame from the result when as_df is set."""
+        # Mock the driver and session
+        mock_driver = MagicMock()
+        mock_session = MagicMock()
+        mock_driver.session.return_value.__enter__.return_value = mock_session
+        
+        # Mock query result
+        expected_df = pd.DataFrame(self.sample_risk_data)
+        mock_session.run.return_value.to_df.return_value = expected_df
+        
+        mock_graph_database.driver.return_value = mock_driver
+        
+        # Create tools instance
+        tools = EnergyAgentTools(
+            uri=self.mock_uri,
+            username=self.mock_username,
+            password=self.mock_password,
+            database=self.mock_database
+        )
+        
+        # Test DataFrame query
+        result = tools._execute_query("MATCH (n) RETURN n", as_df=True)
+        
+        # Verify result
+        self.assertIs(result, expected_df)
+        mock_session.run.return_value.to_df.assert_called_once_with(parse_dates=True)
+    
+    @patch('app.EnergyAgentTools._execute_query')
+    @patch('app.GraphDatabase')
+    def test_risky_equipment_query_parameters(self, mock_graph_database, mock_execute_query):
+        """Test the risk lookup passes its threshold as a query parameter."""
+        # Mock the driver and session
+        mock_driver = MagicMock()
+        mock_graph_database.driver.return_value = mock_driver
+        mock_execute_query.return_value = self.sample_risk_data
+        
+        # Create tools instance
+        tools = EnergyAgentTools(
+            uri=self.mock_uri,
+            username=self.mock_username,
+            password=self.mock_password,
+            database=self.mock_database
+        )
+        
+        # Test risky equipment lookup
+        result = tools.get_risky_equipment(0.7)
+        
+        # Verify result
+        self.assertEqual(result, self.sample_risk_data)
+        query, parameters = mock_execute_query.call_args[0]
+        self.assertIn("r.risk_score >= $risk_threshold", query)
+        self.assertEqual(parameters, {"risk_threshold": 0.7})
+        self.assertFalse(mock_execute_query.call_args[1]["as_df"])
+    
+    @patch('app.EnergyAgentTools._execute_query')
+    @patch('app.GraphDatabase')
+    def test_search_issue_type_matches_substrings(self, mock_graph_database, mock_execute_query):
+        """Test issue searches keep substring matching and connecting issues no schema writes."""
+        # Mock the driver and session
+        mock_driver = MagicMock()
+        mock_graph_database.driver.return_value = mock_driver
+        mock_execute_query.return_value = self.sample_maintenance_data
+        
+        # Create tools instance
+        tools = EnergyAgentTools(
+            uri=self.mock_uri,
+            username=self.mock_username,
+            password=self.mock_password,
+            database=self.mock_database
+        )
+        mock_driver.execute_query.assert_not_called()
+        
+        # Test search with a mid-word issue filter
+        tools.search_equipment_maintenance_records(issue_type="former", days_back=30)
+        
+        # Verify the case-insensitive substring predicate
+        query, parameters = mock_execute_query.call_args[0]
+        self.assertIn("toLower(m.description) CONTAINS toLower($issue_type)", query)
+        self.assertEqual(parameters["issue_type"], "former")
+    
+    @patch('app.EnergyAgentTools._execute_query')
+    @patch('app.GraphDatabase')
+    def test_get_equipment_types(self, mock_graph_database, mock_execute_query):
+        """Test equipment types are returned as a flat list."""
+        # Mock the driver and session
+        mock_graph_database.driver.return_value = MagicMock()
+        mock_execute_query.return_value = [
+            {"equipment_type": "Generator"},
+            {"equipment_type": "Transformer"}
+        ]
+        
+        # Create tools instance
+        tools = EnergyAgentTools(
+            uri=self.mock_uri,
+            username=self.mock_username,
+            password=self.mock_password,
+            database=self.mock_database
+        )
+        
+        # Test type lookup
+        result = tools.get_equipment_types()
+        
+        # Verify result
+        self.assertEqual(result, ["Generator", "Transformer"])
+        self.assertIn("DISTINCT e.type", mock_execute_query.call_args[0][0])
+    
     @patch('app.GraphDatabase')
     def test_close_connection(self, mock_graph_database):
         """Test closing database connection."""
@@ -515,6 +624,38 @@ class TestEnergyAgentTools(unittest.TestCase):
         # Verify driver close was called
         mock_driver.close.assert_called_once()
     
+    def test_shared_driver_validation(self):
+        """Test shared drivers and tools are only reused while connected."""
+        live_driver = Mock()
+        dead_driver = Mock()
+        dead_driver.verify_connectivity.side_effect = ServiceUnavailable("Connection lost")
+        
+        self.assertTrue(_driver_alive(live_driver))
+        self.assertFalse(_driver_alive(dead_driver))
+        self.assertFalse(_tools_alive(Mock(driver=dead_driver)))
+        self.assertFalse(_tools_alive(Mock(driver=None)))
+    
+    @patch('app.get_driver')
+    def test_close_keeps_other_shared_drivers(self, mock_get_driver):
+        """Test close shuts only this instance's driver instead of clearing the shared cache."""
+        mock_driver = Mock()
+        mock_get_driver.return_value = mock_driver
+        
+        tools = EnergyAgentTools(
+            uri=self.mock_uri,
+            username=self.mock_username,
+            password=self.mock_password,
+            database=self.mock_database
+        )
+        tools.close()
+        
+        mock_driver.close.assert_called_once()
+        mock_get_driver.clear.assert_not_called()
+        self.assertIsNone(tools.driver)
+        
+        # A closed driver fails validation, so only its cache entry is rebuilt
+        self.assertFalse(_driver_alive(Mock(_closed=True)))
+    
     @patch('app.GraphDatabase')
     def test_analyze_maintenance_patterns_success(self, mock_graph_database):
         """Test successful analyze_maintenance_patterns."""
@@ -573,6 +714,23 @@ class TestEnergyAgentTools(unittest.TestCase):
         
         # Verify result
         self.assertIn("No maintenance records available", result)
+    
+    def test_cached_maintenance_analysis_does_not_cache_failures(self):
+        """Test a failed Claude call raises instead of being cached as the analysis."""
+        cached_maintenance_analysis.clear()
+        tools = Mock()
+        tools.search_equipment_maintenance_records.return_value = self.sample_maintenance_data
+        tools.build_maintenance_prompt.return_value = "prompt"
+        client = Mock()
+        client.analyze_grid_data.side_effect = ["Analysis failed: Rate limit exceeded", "Generators need attention"]
+        
+        with self.assertRaises(ClaudeAnalysisError):
+            cached_maintenance_analysis(tools, client, self.mock_uri, self.mock_database, None, None, 30)
+        
+        # The retry reaches Claude again and its result is the one cached
+        result = cached_maintenance_analysis(tools, client, self.mock_uri, self.mock_database, None, None, 30)
+        self.assertEqual(result, "Generators need attention")
+        self.assertEqual(client.analyze_grid_data.call_count, 2)
 
 
 if __name__ == '__main__':
@@ -19,6 +19,7 @@ from claude_utils import (
     _summarize_dataframe,
     _summarize_risk_data,
     _create_detailed_vibration_summary,
+    parse_dates,
     DataFormattingError
 )
 
@@ -325,6 +326,23 @@ class TestUtilityFunctions(unittest.TestCase):
         self.assertIn("error", result)
         self.assertEqual(result["error"], "DataFrame is empty")
     
+    def test_parse_dates_iso_strings_and_datetimes(self):
+        """Test parse_dates parses ISO strings and returns datetime columns unchanged."""
+        parsed = parse_dates(pd.Series(["2024-01-15", "2024-02-10T08:30:00", None]))
+        
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(parsed))
+        self.assertEqual(parsed.iloc[1], pd.Timestamp("2024-02-10 08:30:00"))
+        self.assertTrue(pd.isna(parsed.iloc[2]))
+        self.assertIs(parse_dates(parsed), parsed)
+    
+    def test_parse_dates_non_iso_and_invalid_strings(self):
+        """Test parse_dates still parses non-ISO dates and coerces garbage to NaT instead of raising."""
+        parsed = parse_dates(pd.Series(["2024-01-15", "01/20/2024", "not a date"]))
+        
+        self.assertEqual(parsed.iloc[0], pd.Timestamp("2024-01-15"))
+        self.assertEqual(parsed.iloc[1], pd.Timestamp("2024-01-20"))
+        self.assertTrue(pd.isna(parsed.iloc[2]))
+    
     def test_summarize_dataframe_with_numeric_stats(self):
         """Test _summarize_dataframe with numeric statistics."""
         result = _summarize_dataframe(self.sample_dataframe)